@@ -1,26 +1,105 @@
 import streamlit as st
-import pandas as pd
-import os
-import time
-import random
 from user_preferences import USER_PERSONAS
-from rss_parser import fetch_rss_feeds
-from article_categorizer import categorize_articles
-from newsletter_generator import generate_newsletter
-from article_summarizer import summarize_articles
+from feed_cache import FeedCache
+from article_store import ArticleStore
+from feed_health import FeedHealth
+from category_cache import CategoryCache
+from summary_cache import SummaryCache
+from refresher import REFRESH_INTERVAL, ArticleRefresher
+from article_summarizer import SUMMARY_BUDGET, SUMMARY_WORKERS, download_savings
+from rss_parser import FETCH_DEADLINE
+from render_cache import RENDER_CACHE_PATH, RenderCache, newsletter_key
+from newsletter_generator import newsletter_info
+from pipeline import assemble_newsletter, refresh_articles, select_sections, stream_newsletter
+from instrumentation import METRICS, METRICS_FILE
 from utils import get_timestamp
 st.set_page_config(
     page_title="AI-Driven Newsletter System", 
     page_icon="📰",
     layout="wide"
 )
-@st.cache_data(ttl=1800)  # Cache data for 30 minutes
-def get_articles():
-    """Fetch articles from RSS feeds."""
-    articles = fetch_rss_feeds()
-    if articles:
-        return categorize_articles(articles)
-    return []
+@st.cache_resource
+def get_article_store():
+    """Open the persistent article store shared by all sessions."""
+    return ArticleStore()
+@st.cache_resource
+def get_summary_cache():
+    """Open the persistent summary cache shared by all sessions."""
+    return SummaryCache()
+@st.cache_resource
+def get_render_cache():
+    """Open the render cache shared by all sessions, backed by disk across restarts."""
+    return RenderCache(path=RENDER_CACHE_PATH)
+@st.cache_resource
+def get_feed_health():
+    """Load the feed health state shared by all sessions."""
+    return FeedHealth()
+@st.cache_resource
+def get_category_cache():
+    """Open the persistent category cache shared by all sessions."""
+    return CategoryCache()
+@st.cache_resource
+def get_refresher():
+    """
+    Start the background refresher shared by all sessions.
+    
+    It refetches the feeds every 30 minutes; sessions are always served the
+    last good article snapshot, including while a refresh runs. Feeds that
+    keep failing are paused, and a refresh stops waiting for slow feeds
+    after FETCH_DEADLINE seconds.
+    """
+    store = get_article_store()
+    health = get_feed_health()
+    category_cache = get_category_cache()
+    refresher = ArticleRefresher(lambda: refresh_articles(store, FeedCache(), health=health, deadline=FETCH_DEADLINE,
+                                                          category_cache=category_cache),
+                                 interval=REFRESH_INTERVAL)
+    refresher.start()
+    return refresher
+def show_timings():
+    """Collapsible panel with stage, feed and summary timings and fallback counts."""
+    metrics = METRICS.snapshot()
+    with st.expander("⏱️ Pipeline timings", expanded=False):
+        def timer_rows(name, label):
+            rows = [{label: timer["labels"].get(label, ""), "runs": timer["count"],
+                     "mean (s)": round(timer["mean_s"], 3), "max (s)": round(timer["max_s"], 3),
+                     "total (s)": round(timer["total_s"], 3)}
+                    for timer in metrics["timers"] if timer["name"] == name]
+            return sorted(rows, key=lambda row: row["max (s)"], reverse=True)
+        
+        st.write("**Stages**")
+        st.table(timer_rows("stage_seconds", "stage"))
+        st.write("**Summary steps**")
+        st.table(timer_rows("summary_step_seconds", "step"))
+        st.write("**Slowest feeds**")
+        st.table(timer_rows("feed_seconds", "feed")[:10])
+        
+        slowest = sorted((event for event in metrics["recent"] if event["name"] == "summary_seconds"),
+                         key=lambda event: event["seconds"], reverse=True)[:5]
+        if slowest:
+            st.write("**Slowest recent summaries**")
+            st.table([{"article": event["detail"], "seconds": round(event["seconds"], 3)} for event in slowest])
+        
+        savings = download_savings(metrics)
+        if savings["avoidance_rate"] is not None:
+            caption = (f"Local summaries avoided {savings['avoided']} of "
+                       f"{savings['avoided'] + savings['downloaded']} downloads ({savings['avoidance_rate']:.0%})")
+            if savings["seconds_saved"] is not None:
+                caption += f", saving about {savings['seconds_saved']:.1f}s of article latency"
+            st.caption(caption)
+        
+        st.write("**Counters**")
+        st.table([{"counter": counter["name"], "labels": ", ".join(f"{k}={v}" for k, v in counter["labels"].items()),
+                   "value": counter["value"]}
+                  for counter in sorted(metrics["counters"], key=lambda c: (c["name"], sorted(c["labels"].items())))])
+        for gauge in metrics["gauges"]:
+            if gauge["name"] == "stage_peak_memory_bytes":
+                st.caption(f"Peak memory in {gauge['labels']['stage']}: {gauge['value'] / 2**20:.1f} MB")
+        
+        st.download_button("Download metrics (JSON)", METRICS.to_json(), file_name="metrics.json",
+                           mime="application/json")
+        st.download_button("Download metrics (Prometheus)", METRICS.to_prometheus(), file_name="metrics.prom",
+                           mime="text/plain")
 def main():
     st.title("AI-Driven Personalized Newsletter System")
     st.write("This system curates personalized newsletters based on user preferences and interests.")
@@ -55,44 +134,110 @@ def main():
     st.sidebar.subheader("Newsletter Generation")
     
     # Add refresh option to force refresh the cached articles
-    refresh_data = st.sidebar.checkbox("Refresh Article Data", value=False)
-    if refresh_data:
-        st.cache_data.clear()
-        st.sidebar.success("✅ Cache cleared! Article data will be refreshed.")
+    refresher = get_refresher()
+    if st.sidebar.button("Refresh Article Data"):
+        if refresher.refresh():
+            st.sidebar.success("✅ Refreshing articles in the background.")
+        else:
+            st.sidebar.info("A refresh is already running.")
+    
+    current = refresher.snapshot(wait=False)
+    if current is not None:
+        status = f"Articles from {current.refreshed_at:%H:%M} ({len(current.articles)} articles)"
+        if refresher.refreshing:
+            status += ", refreshing..."
+        st.sidebar.caption(status)
+    if refresher.last_error:
+        st.sidebar.caption(f"Last refresh failed: {refresher.last_error}")
+    paused = get_feed_health().open_circuits()
+    if paused:
+        st.sidebar.caption(f"{len(paused)} failing feed(s) paused")
     
     generate_button = st.sidebar.button("Generate Newsletter")
     
+    cache_stats = get_summary_cache().stats()
+    st.sidebar.caption(
+        f"Summary cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} saved)"
+    )
+    last_lookup = get_category_cache().stats()["last_lookup"]
+    if last_lookup:
+        st.sidebar.caption(f"Category cache: {last_lookup['hit_rate']:.0%} hits in the last refresh")
+    
     # Main content area
     if generate_button:
-        with st.spinner("Generating your personalized newsletter..."):
-            # Step 1: Fetch and categorize articles
-            articles = get_articles()
+        with st.spinner("Fetching and categorizing articles..."):
+            # Step 1: Use the current article snapshot; only the very first load waits for the feeds
+            current = refresher.snapshot()
+            index = current.index if current else None
+            articles = current.articles if current else []
             
-            if not articles:
-                st.error("Unable to fetch articles. Please check your internet connection and try again.")
-                return
-            
-            # Step 2: Filter articles based on user preferences
-            filtered_articles = filter_articles_for_user(articles, user_data)
-            
-            if not filtered_articles:
-                st.warning(f"No relevant articles found for {selected_user}. Try refreshing the data.")
-                return
-            
-            # Step 3: Summarize articles
-            summarized_articles = summarize_articles(filtered_articles)
-            
-            # Step 4: Generate newsletter
-            newsletter_content = generate_newsletter(summarized_articles, user_data)
+        if not articles:
+            st.error("Unable to fetch articles. Please check your internet connection and try again.")
+            return
+        
+        # Step 2: Filter; the same persona and articles give the newsletter rendered last time
+        sections = select_sections(articles, user_data, index=index)
+        if not sections:
+            st.warning(f"No relevant articles found for {selected_user}. Try refreshing the data.")
+            return
+        render_cache = get_render_cache()
+        info = newsletter_info(user_data)
+        keys = {fmt: newsletter_key(user_data, sections, info, fmt) for fmt in ("markdown", "html", "text")}
+        rendered = {fmt: render_cache.get(key) for fmt, key in keys.items()}
+        if all(rendered.values()):
+            newsletter_data = {
+                "content": rendered["markdown"],
+                "html": rendered["html"],
+                "text": rendered["text"],
+                "timestamp": get_timestamp()
+            }
+            st.success(f"✅ Newsletter for {selected_user} is up to date (served from cache).")
+        else:
+            # Steps 3-4: Summarize and render, showing each section as soon as it is ready
+            live_view = st.empty()
+            with live_view.container():
+                parts = []
+                placeholders = {}
+                for part in stream_newsletter(articles, user_data, index=index, store=get_article_store(),
+                                              cache=get_summary_cache(), workers=SUMMARY_WORKERS,
+                                              sections=sections, render_cache=render_cache,
+                                              time_budget=SUMMARY_BUDGET):
+                    parts.append(part)
+                    if part["type"] == "layout":
+                        placeholders["header"] = st.empty()
+                        for position, category in enumerate(part["categories"]):
+                            placeholders[position] = st.empty()
+                            placeholders[position].info(f"Summarizing {category} articles...")
+                        placeholders["footer"] = st.empty()
+                    elif part["type"] == "section":
+                        placeholders[part["position"]].markdown(part["content"])
+                    else:
+                        placeholders[part["type"]].markdown(part["content"])
+            # The finished newsletter is displayed below from the session state
+            live_view.empty()
             
             # Save newsletter with timestamp
             timestamp = get_timestamp()
-            st.session_state[f"newsletter_{selected_user}"] = {
-                "content": newsletter_content,
+            newsletter_data = {
+                "content": assemble_newsletter(parts),
+                "html": assemble_newsletter(parts, fmt="html"),
+                "text": assemble_newsletter(parts, fmt="text"),
                 "timestamp": timestamp
             }
+            # A newsletter with snippets in place of summaries is rebuilt next time
+            degraded = sum(len(part["degraded"]) for part in parts if part["type"] == "section")
+            if not any(part["fallback"] for part in parts if part["type"] == "section"):
+                for fmt, field in (("markdown", "content"), ("html", "html"), ("text", "text")):
+                    render_cache.put(keys[fmt], newsletter_data[field])
+            st.success(f"✅ Generated personalized newsletter for {selected_user}.")
+            if degraded:
+                st.info(f"{degraded} article(s) show a feed snippet because their sites did not respond "
+                        f"within {SUMMARY_BUDGET}s.")
         
-        st.success(f"✅ Generated personalized newsletter for {selected_user}.")
+        st.session_state[f"newsletter_{selected_user}"] = newsletter_data
+        if METRICS_FILE:
+            METRICS.write(METRICS_FILE)
     
     # Display generated newsletter if available
     if f"newsletter_{selected_user}" in st.session_state:
@@ -104,112 +249,31 @@ def main():
         # Display newsletter using native Streamlit markdown rendering
         st.markdown(newsletter_data["content"])
         
-        # Add option to download as markdown
+        # Add options to download as markdown, HTML or plain text
+        file_stem = f"{selected_user.replace(' ', '_')}_newsletter_{newsletter_data['timestamp'].replace(':', '-').replace(' ', '_')}"
         st.download_button(
             label="Download Newsletter as Markdown",
             data=newsletter_data["content"],
-            file_name=f"{selected_user.replace(' ', '_')}_newsletter_{newsletter_data['timestamp'].replace(':', '-').replace(' ', '_')}.md",
+            file_name=f"{file_stem}.md",
             mime="text/markdown"
         )
+        if "html" in newsletter_data:
+            st.download_button(
+                label="Download Newsletter as HTML",
+                data=newsletter_data["html"],
+                file_name=f"{file_stem}.html",
+                mime="text/html"
+            )
+            st.download_button(
+                label="Download Newsletter as Plain Text",
+                data=newsletter_data["text"],
+                file_name=f"{file_stem}.txt",
+                mime="text/plain"
+            )
+        
+        show_timings()
     else:
         st.info("👈 Select a user and click 'Generate Newsletter' to create a personalized newsletter.")
         st.write("The system will fetch articles from RSS feeds, categorize them using NLP, and generate a personalized newsletter based on the selected user's interests.")
-def filter_articles_for_user(categorized_articles, user_data):
-    """Filter articles based on user preferences with enhanced matching for entertainment content."""
-    filtered_articles = []
-    
-    # Get user interests and preferred sources
-    interests = [interest.lower() for interest in user_data["interests"]]
-    sources = [source.lower() for source in user_data["sources"]]
-    
-    # Special case for entertainment interests (for Lisa Thompson)
-    entertainment_keywords = ["movie", "film", "cinema", "tv", "television", "show", "celebrity", 
-                            "music", "song", "album", "artist", "actor", "actress", "entertainment",
-                            "hollywood", "book", "novel", "author", "star", "concert", "festival",
-                            "award", "performance", "theater", "series", "streaming", "netflix",
-                            "disney", "hbo", "release", "premiere"]
-    
-    # Check if user has entertainment interests
-    has_entertainment_interests = any(interest in entertainment_keywords for interest in interests)
-    
-    for article in categorized_articles:
-        # Get article properties
-        article_categories = [cat.lower() for cat in article.get("categories", [])]
-        article_source = article.get("source", "").lower()
-        article_title = article.get("title", "").lower()
-        article_content = article.get("content", "").lower()
-        
-        # Calculate relevance score
-        relevance_score = 0
-        
-        # Check for category/interest match
-        for category in article_categories:
-            for interest in interests:
-                if interest in category or category in interest:
-                    relevance_score += 3
-                    break
-        
-        # Check for interest in title (stronger match)
-        for interest in interests:
-            if interest in article_title:
-                relevance_score += 4
-                break
-        
-        # Check for interest in content
-        if relevance_score == 0:  # Only check content if no matches found yet
-            for interest in interests:
-                if interest in article_content:
-                    relevance_score += 1
-                    break
-        
-        # Check for source match
-        for source in sources:
-            if source in article_source or article_source in source:
-                relevance_score += 2
-                break
-        
-        # Special handling for entertainment content when needed
-        if has_entertainment_interests and relevance_score == 0:
-            # Check if article is about entertainment
-            for keyword in entertainment_keywords:
-                if keyword in article_title or keyword in " ".join(article_categories):
-                    relevance_score += 2
-                    break
-                elif keyword in article_content:
-                    relevance_score += 1
-                    break
-        
-        # Add article if it's relevant enough
-        if relevance_score > 0:
-            article["relevance_score"] = relevance_score
-            filtered_articles.append(article)
-    
-    # Sort by relevance score
-    filtered_articles.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
-    
-    # If we still have no articles, try a broader match (especially for entertainment)
-    if not filtered_articles and has_entertainment_interests:
-        for article in categorized_articles:
-            article_content = article.get("content", "").lower()
-            article_title = article.get("title", "").lower()
-            
-            # Check for any entertainment-related content
-            for keyword in entertainment_keywords:
-                if keyword in article_title or keyword in article_content:
-                    article["relevance_score"] = 1
-                    filtered_articles.append(article)
-                    break
-        
-        # Sort these by relevance score
-        filtered_articles.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
-    
-    # If still no articles, include some general articles
-    if not filtered_articles:
-        # Take a sample of recent articles
-        sample_size = min(10, len(categorized_articles))
-        filtered_articles = random.sample(categorized_articles, sample_size)
-    
-    # Limit to top 15 articles
-    return filtered_articles[:15]
 if __name__ == "__main__":
     main()
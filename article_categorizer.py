@@ -1,5 +1,10 @@
 import re
 import string
+from collections import Counter
+from itertools import repeat
+import numpy as np
+from article_record import with_fields
+from instrumentation import count, stage
 # Core categories for article classification with enhanced entertainment keywords
 CATEGORIES = {
     "Technology": [
@@ -42,6 +47,13 @@ CATEGORIES = {
         "olympics", "league", "coach", "stadium", "score", "win", "race", "racing"
     ]
 }
+# Translation table used to strip punctuation (built once)
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+WHITESPACE_RE = re.compile(r'\s+')
+# Separator used to preprocess and tokenize a whole block of texts in one call
+BLOCK_SEPARATOR = "\x00"
+# Replaces the separator inside a text; like the separator, it does not split a token
+SEPARATOR_STANDIN = "\ufffd"
 def preprocess_text(text):
     """Preprocess text for categorization."""
     if not text:
@@ -51,46 +63,156 @@ def preprocess_text(text):
     text = text.lower()
     
     # Remove punctuation
-    text = text.translate(str.maketrans('', '', string.punctuation))
+    text = text.translate(PUNCTUATION_TABLE)
     
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_RE.sub(' ', text).strip()
     
     return text
-def categorize_article(article):
-    """Categorize a single article based on title and content."""
-    # Create a copy of the article to avoid modifying the original
-    article_copy = dict(article)
+class KeywordMatcher:
+    """
+    Token-boundary matcher for all category keywords.
     
-    # Get the text to analyze (title + content)
-    title = article_copy.get("title", "")
-    content = article_copy.get("content", "")
-    text = title + " " + content
+    Single-word keywords are counted from one Counter over the text's tokens;
+    multi-word phrases are only searched for when their first token occurs.
+    Matching on whole tokens means "ai" no longer matches inside "said";
+    a plain plural ("startups" for "startup") still counts as a match.
+    count_block matches many texts at once over arrays of token ids.
+    """
     
-    # Use feed category as a fallback
-    feed_category = article_copy.get("feed_category", "")
-    
-    # Preprocess the text
-    preprocessed_text = preprocess_text(text)
+    def __init__(self, categories):
+        self.category_names = list(categories)
+        self.keywords = []  # keyword strings, indexed by keyword id
+        self.keyword_categories = []  # category index of each keyword id
+        self._tokens = {}  # token -> [keyword id] for single-word keywords
+        self._phrases = {}  # first token -> [(padded phrase, keyword id)] for multi-word keywords
+        phrase_variants = []  # (phrase tokens, keyword id) for multi-word keywords
+        
+        for category_index, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                phrase = tuple(preprocess_text(keyword).split())
+                if not phrase:
+                    continue
+                keyword_id = len(self.keywords)
+                self.keywords.append(keyword)
+                self.keyword_categories.append(category_index)
+                plural = phrase[:-1] + (phrase[-1] + "s",)
+                for variant in (phrase, plural):
+                    if len(variant) == 1:
+                        self._tokens.setdefault(variant[0], []).append(keyword_id)
+                    else:
+                        # Phrases are matched against text with doubled spaces so
+                        # back-to-back occurrences do not share a separator
+                        padded = " " + "  ".join(variant) + " "
+                        self._phrases.setdefault(variant[0], []).append((padded, keyword_id))
+                        phrase_variants.append((variant, keyword_id))
+        
+        # Token ids for count_block: keyword tokens from 1, the block separator -1, any other token 0
+        vocabulary = sorted(set(self._tokens) | {token for variant, _ in phrase_variants for token in variant})
+        self._token_ids = {token: token_id for token_id, token in enumerate(vocabulary, 1)}
+        self._token_ids[BLOCK_SEPARATOR] = -1
+        # Single-word keyword ids of each token id, as offsets into one array
+        token_keywords = [[]] + [self._tokens.get(token, []) for token in vocabulary]
+        self._token_keyword_offsets = np.cumsum([0] + [len(ids) for ids in token_keywords])
+        self._token_keywords = np.array([keyword_id for ids in token_keywords for keyword_id in ids], dtype=np.int64)
+        # str.count does not count overlapping occurrences, so phrases that can overlap themselves skip those
+        self._phrase_token_ids = [
+            (np.array([self._token_ids[token] for token in variant]), keyword_id,
+             any(variant[:size] == variant[-size:] for size in range(1, len(variant))))
+            for variant, keyword_id in phrase_variants
+        ]
+        self.keyword_category_ids = np.array(self.keyword_categories, dtype=np.int64)
     
-    # Count category keyword occurrences
-    category_scores = {}
+    def count(self, text):
+        """
+        Count keyword occurrences in preprocessed text.
+        
+        Returns:
+            Dict of {keyword id: occurrences} for keywords that occur
+        """
+        counts = {}
+        token_counts = Counter(text.split())
+        
+        for token in token_counts.keys() & self._tokens.keys():
+            occurrences = token_counts[token]
+            for keyword_id in self._tokens[token]:
+                counts[keyword_id] = counts.get(keyword_id, 0) + occurrences
+        
+        padded_text = None
+        for token in token_counts.keys() & self._phrases.keys():
+            if padded_text is None:
+                padded_text = " " + "  ".join(text.split()) + " "
+            for padded, keyword_id in self._phrases[token]:
+                occurrences = padded_text.count(padded)
+                if occurrences:
+                    counts[keyword_id] = counts.get(keyword_id, 0) + occurrences
+        return counts
     
-    for category, keywords in CATEGORIES.items():
-        score = 0
-        for keyword in keywords:
-            # Count occurrences of the keyword
-            keyword_count = preprocessed_text.count(keyword)
-            
-            # Add to score (with title matches weighted higher)
-            if title and keyword in preprocess_text(title):
-                score += 5 * keyword_count  # Title match is weighted higher
-            else:
-                score += keyword_count
+    def count_block(self, texts):
+        """
+        Count keyword occurrences in many preprocessed texts at once.
         
-        if score > 0:
-            category_scores[category] = score
+        All texts are tokenized together into one array of token ids.
+        Single-word keywords are looked up for every token at once, and
+        phrases are found as runs of consecutive ids; the counts equal those of
+        `count` for each text.
+        
+        Returns:
+            Sparse text x keyword count matrix as (text rows, keyword ids, counts)
+            arrays, sorted by row, then keyword id
+        """
+        tokens = f" {BLOCK_SEPARATOR} ".join(text.replace(BLOCK_SEPARATOR, SEPARATOR_STANDIN) for text in texts).split()
+        ids = np.fromiter(map(self._token_ids.get, tokens, repeat(0)), dtype=np.int64, count=len(tokens))
+        text_of = np.cumsum(ids == -1)
+        
+        # Single-word keywords: every keyword listed for each token
+        positions = np.flatnonzero(ids > 0)
+        starts = self._token_keyword_offsets[ids[positions]]
+        lengths = self._token_keyword_offsets[ids[positions] + 1] - starts
+        expanded = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = [text_of[np.repeat(positions, lengths)]]
+        keyword_ids = [self._token_keywords[np.repeat(starts, lengths) + np.arange(len(expanded)) - expanded]]
+        
+        # Phrases: positions where each token of the phrase follows the previous one
+        for phrase, keyword_id, overlaps in self._phrase_token_ids:
+            span = len(ids) - len(phrase) + 1
+            if span <= 0:
+                continue
+            found = ids[:span] == phrase[0]
+            for offset in range(1, len(phrase)):
+                found &= ids[offset:span + offset] == phrase[offset]
+            found = np.flatnonzero(found)
+            if overlaps:
+                kept, end = [], -1
+                for position in found.tolist():
+                    if position >= end:
+                        kept.append(position)
+                        end = position + len(phrase)
+                found = np.array(kept, dtype=np.int64)
+            rows.append(text_of[found])
+            keyword_ids.append(np.full(len(found), keyword_id, dtype=np.int64))
+        
+        keys, counts = np.unique(np.concatenate(rows) * len(self.keywords) + np.concatenate(keyword_ids),
+                                 return_counts=True)
+        return keys // len(self.keywords), keys % len(self.keywords), counts
     
+    def score(self, text_counts, title_counts):
+        """
+        Score every category from keyword counts.
+        
+        Keywords that also occur in the title count five times.
+        
+        Returns:
+            Dict of {category: score} for categories with a positive score, in CATEGORIES order
+        """
+        scores = [0] * len(self.category_names)
+        for keyword_id, count in text_counts.items():
+            weight = 5 if keyword_id in title_counts else 1
+            scores[self.keyword_categories[keyword_id]] += weight * count
+        return {name: score for name, score in zip(self.category_names, scores) if score > 0}
+MATCHER = KeywordMatcher(CATEGORIES)
+def rank_categories(category_scores, feed_category):
+    """Turn category scores into the article's top categories, using the feed category as a hint."""
     # Also consider the feed category (if available)
     if feed_category:
         # Look for matching or similar category
@@ -122,20 +244,173 @@ def categorize_article(article):
         top_categories.insert(0, "Entertainment")
     
     # Limit to top 3 categories
-    article_copy["categories"] = top_categories[:3]
+    return top_categories[:3]
+def match_article(article):
+    """
+    Count category keyword occurrences in one pass over the text and one over the title.
+    
+    Returns:
+        (keyword counts of title + content, keyword counts of the title), as from KeywordMatcher.count
+    """
+    # Get the text to analyze (title + content)
+    title = article.get("title", "")
+    content = article.get("content", "")
+    text = title + " " + content
     
-    return article_copy
-def categorize_articles(articles):
-    """Categorize all articles."""
+    text_counts = MATCHER.count(preprocess_text(text))
+    title_counts = MATCHER.count(preprocess_text(title)) if title else {}
+    return text_counts, title_counts
+def categorize_article(article, matches=None):
+    """
+    Categorize a single article based on title and content.
+    
+    ArticleRecords get their categories set in place; plain dicts are copied
+    to avoid modifying the original. `matches` are the article's keyword
+    counts from match_article, if already computed.
+    """
+    text_counts, title_counts = matches or match_article(article)
+    category_scores = MATCHER.score(text_counts, title_counts)
+    
+    # Use feed category as a fallback
+    return with_fields(article, categories=rank_categories(category_scores, article.get("feed_category", "")))
+# Number of articles scored per matrix block in batch mode
+BATCH_BLOCK_SIZE = 2000
+def _preprocess_block(texts):
+    """
+    Preprocess many texts with a single lower/translate pass.
+    
+    Whitespace is left as is: the matcher splits on any whitespace anyway.
+    """
+    joined = BLOCK_SEPARATOR.join(text.replace(BLOCK_SEPARATOR, SEPARATOR_STANDIN) for text in texts)
+    return joined.lower().translate(PUNCTUATION_TABLE).split(BLOCK_SEPARATOR) if texts else []
+def _block_counts(rows, keyword_ids, counts, size):
+    """Split a sparse count matrix from count_block into one {keyword id: occurrences} dict per row."""
+    bounds = np.searchsorted(rows, np.arange(size + 1)).tolist()
+    keyword_ids, counts = keyword_ids.tolist(), counts.tolist()
+    return [dict(zip(keyword_ids[start:end], counts[start:end])) for start, end in zip(bounds, bounds[1:])]
+def _score_block(articles, with_matches=False):
+    """
+    Score a block of articles from sparse article x keyword count matrices.
+    
+    Title + content and titles alone are counted into separate matrices; a
+    keyword's count weighs five times where the title matrix has it too, and
+    the weighted matrix times the keyword x category membership gives every
+    category score.
+    
+    Returns:
+        (articles x categories score array, failed rows, {row: (text counts,
+        title counts)} if `with_matches`, else None)
+    """
+    failed = set()
+    rows, texts, titles = [], [], []
+    for row, article in enumerate(articles):
+        try:
+            title = article.get("title", "")
+            texts.append(title + " " + article.get("content", ""))
+            titles.append(title)
+            rows.append(row)
+        except Exception:
+            failed.add(row)
+    rows = np.array(rows, dtype=np.int64)
+    
+    keyword_count = len(MATCHER.keywords)
+    text_rows, text_keywords, text_counts = MATCHER.count_block(_preprocess_block(texts))
+    title_rows, title_keywords, title_counts = MATCHER.count_block(_preprocess_block(titles))
+    in_title = np.isin(text_rows * keyword_count + text_keywords, title_rows * keyword_count + title_keywords)
+    weighted = np.where(in_title, 5, 1) * text_counts
+    
+    # Sparse (articles x keywords) @ (keywords x categories) membership: each
+    # nonzero adds to the category of its keyword
+    category_count = len(MATCHER.category_names)
+    cells = rows[text_rows] * category_count + MATCHER.keyword_category_ids[text_keywords]
+    scores = np.bincount(cells, weights=weighted, minlength=len(articles) * category_count)
+    scores = scores.astype(np.int64).reshape(len(articles), category_count)
+    
+    matches = None
+    if with_matches:
+        matches = dict(zip(rows.tolist(), zip(_block_counts(text_rows, text_keywords, text_counts, len(texts)),
+                                              _block_counts(title_rows, title_keywords, title_counts, len(texts)))))
+    return scores, failed, matches
+def categorize_articles(articles, batch=False, cache=None):
+    """
+    Categorize all articles.
+    
+    Args:
+        articles: List of article dicts
+        batch: Score the whole batch from sparse article x keyword count
+            matrices with NumPy instead of one article at a time; produces the
+            same categories and is meant for large backfills
+        cache: Optional CategoryCache; only articles it has no valid entry for are categorized
+    """
+    with stage("categorize"):
+        if cache is not None:
+            return _categorize_cached(articles, batch, cache)
+        if batch:
+            return _categorize_batch(articles)[0]
+        return _categorize_serial(articles)[0]
+def _categorize_serial(articles):
+    """Categorize articles one at a time; returns (categorized articles, keyword counts or None per article)."""
     categorized = []
+    matches = []
     for article in articles:
         try:
-            categorized_article = categorize_article(article)
-            categorized.append(categorized_article)
+            article_matches = match_article(article)
+            categorized.append(categorize_article(article, article_matches))
+            matches.append(article_matches)
         except Exception as e:
             # If categorization fails, just add the original article
+            count("categorize_errors")
             if "categories" not in article:
                 article["categories"] = [article.get("feed_category", "General")]
             categorized.append(article)
+            matches.append(None)
+    
+    return categorized, matches
+def _categorize_batch(articles, with_matches=False):
+    """
+    Categorize articles block by block from term-document count matrices.
+    
+    Returns the same as _categorize_serial; the keyword counts per article are
+    only built `with_matches`, and are None otherwise.
+    """
+    categorized = []
+    matches = []
+    for start in range(0, len(articles), BATCH_BLOCK_SIZE):
+        block = articles[start:start + BATCH_BLOCK_SIZE]
+        scores, failed, block_matches = _score_block(block, with_matches)
+        
+        for row, article in enumerate(block):
+            if row in failed:
+                # Same fallback as the per-article path
+                if "categories" not in article:
+                    article["categories"] = [article.get("feed_category", "General")]
+                categorized.append(article)
+                matches.append(None)
+                continue
+            
+            category_scores = {name: int(score) for name, score in zip(MATCHER.category_names, scores[row]) if score > 0}
+            categorized.append(with_fields(article, categories=rank_categories(category_scores,
+                                                                               article.get("feed_category", ""))))
+            matches.append(block_matches[row] if with_matches else None)
+    
+    return categorized, matches
+def _categorize_cached(articles, batch, cache):
+    """Take categories from the cache and categorize (and cache) only the misses."""
+    cached = cache.lookup(articles)
+    categorized = list(articles)
+    misses = []
+    for position, categories in enumerate(cached):
+        if categories is None:
+            misses.append(position)
+        else:
+            categorized[position] = with_fields(articles[position], categories=categories)
     
+    missed = [articles[position] for position in misses]
+    computed, matches = _categorize_batch(missed, with_matches=True) if batch else _categorize_serial(missed)
+    entries = []
+    for position, article, article_matches in zip(misses, computed, matches):
+        categorized[position] = article
+        if article_matches is not None:
+            entries.append((article, article_matches))
+    cache.store(entries)
     return categorized
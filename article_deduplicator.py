@@ -0,0 +1,202 @@
+import numpy as np
+from article_categorizer import PUNCTUATION_TABLE
+from article_record import with_fields
+from instrumentation import count, stage
+
+# Words per shingle and how much of the content is compared; wire copies share their opening
+SHINGLE_SIZE = 3
+CONTENT_CHARS = 1000
+# MinHash signature of BANDS * ROWS values; articles become LSH candidates when all
+# rows of one band match, i.e. from a Jaccard similarity of about (1 / BANDS) ** (1 / ROWS)
+BANDS = 16
+ROWS = 4
+# Estimated Jaccard similarity a candidate pair needs to be clustered
+SIMILARITY_THRESHOLD = 0.5
+_SEED = 20240115
+_SEPARATOR = "\x00"
+_BLOCK_SIZE = 2000
+
+_rng = np.random.default_rng(_SEED)
+# Multiply-shift hash functions, one per signature row: h(x) = (a * x + b) >> 32 with odd a
+_HASH_A = _rng.integers(1, 2**63, size=BANDS * ROWS, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _rng.integers(0, 2**63, size=BANDS * ROWS, dtype=np.uint64)
+_SHINGLE_MULTIPLIERS = _rng.integers(1, 2**63, size=SHINGLE_SIZE, dtype=np.uint64) | np.uint64(1)
+_BAND_MULTIPLIERS = _rng.integers(1, 2**63, size=ROWS, dtype=np.uint64) | np.uint64(1)
+
+def _shingles(articles):
+    """
+    Hash the word shingles of every article's title and content opening.
+    
+    Returns:
+        (shingle hashes grouped by article, number of shingles per article)
+    """
+    # Tokenize in blocks, with a separator token between articles, to keep the token lists small
+    vocabulary = {_SEPARATOR: 0}
+    id_blocks = []
+    for block_start in range(0, len(articles), _BLOCK_SIZE):
+        texts = [f"{article.get('title', '')} {article.get('content', '')[:CONTENT_CHARS]}".replace(_SEPARATOR, " ")
+                 for article in articles[block_start:block_start + _BLOCK_SIZE]]
+        tokens = f" {_SEPARATOR} ".join(texts).lower().translate(PUNCTUATION_TABLE).split()
+        tokens.append(_SEPARATOR)
+        # Number tokens in order of first appearance so signatures do not depend on hash seeds
+        for token in dict.fromkeys(tokens):
+            if token not in vocabulary:
+                vocabulary[token] = len(vocabulary)
+        id_blocks.append(np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.uint64, count=len(tokens)))
+    
+    token_ids = np.concatenate(id_blocks) if id_blocks else np.zeros(0, dtype=np.uint64)
+    is_separator = token_ids == 0
+    lengths = np.diff(np.flatnonzero(is_separator), prepend=-1) - 1
+    token_ids = token_ids[~is_separator]
+    shingle_count = max(len(token_ids) - SHINGLE_SIZE + 1, 0)
+    with np.errstate(over="ignore"):
+        hashes = np.zeros(shingle_count, dtype=np.uint64)
+        for offset, multiplier in enumerate(_SHINGLE_MULTIPLIERS):
+            hashes += token_ids[offset:offset + shingle_count] * multiplier
+    
+    # Drop shingles that run across the end of an article
+    per_article = np.maximum(lengths - SHINGLE_SIZE + 1, 0)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    keep = np.zeros(shingle_count, dtype=bool)
+    owners = np.repeat(np.arange(len(articles)), per_article)
+    positions = np.arange(per_article.sum()) - np.repeat(np.cumsum(per_article) - per_article, per_article)
+    keep[starts[owners] + positions] = True
+    return hashes[keep], per_article
+
+def minhash_signatures(articles):
+    """
+    MinHash signatures over title and content shingles.
+    
+    Returns:
+        (BANDS * ROWS by len(articles) uint64 array, mask of articles that have a signature)
+    """
+    hashes, per_article = _shingles(articles)
+    has_signature = per_article > 0
+    signatures = np.full((BANDS * ROWS, len(articles)), np.iinfo(np.uint64).max, dtype=np.uint64)
+    if not hashes.size:
+        return signatures, has_signature
+    
+    offsets = (np.cumsum(per_article) - per_article)[has_signature]
+    shift = np.uint64(32)
+    buffer = np.empty_like(hashes)
+    with np.errstate(over="ignore"):
+        for row, (a, b) in enumerate(zip(_HASH_A, _HASH_B)):
+            np.multiply(hashes, a, out=buffer)
+            np.add(buffer, b, out=buffer)
+            np.right_shift(buffer, shift, out=buffer)
+            signatures[row, has_signature] = np.minimum.reduceat(buffer, offsets)
+    return signatures, has_signature
+
+def candidate_pairs(signatures, has_signature):
+    """
+    LSH over the signature bands.
+    
+    Articles whose rows agree in any band land in the same bucket; every two
+    members of a bucket form a candidate pair, so two similar articles are
+    compared even when other members of their bucket are not similar to them.
+    
+    Returns:
+        Array of unique (i, j) index pairs with i < j
+    """
+    columns = np.flatnonzero(has_signature)
+    pairs = []
+    with np.errstate(over="ignore"):
+        for band in range(BANDS):
+            rows = signatures[band * ROWS:(band + 1) * ROWS, columns]
+            keys = (rows * _BAND_MULTIPLIERS[:, None]).sum(axis=0)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            bucket_start = np.ones(len(order), dtype=bool)
+            bucket_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            positions = np.arange(len(order))
+            starts = np.maximum.accumulate(np.where(bucket_start, positions, 0))
+            # Pair each member with every member sorted before it in its bucket
+            earlier_count = positions - starts
+            later = np.repeat(positions, earlier_count)
+            earlier = starts[later] + np.arange(len(later)) - np.repeat(np.cumsum(earlier_count) - earlier_count,
+                                                                          earlier_count)
+            pairs.append(np.unique(np.sort(np.stack([columns[order[earlier]], columns[order[later]]]), axis=0),
+                                   axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs, axis=1).T, axis=0)
+
+def cluster_duplicates(articles):
+    """
+    Group near-duplicate articles.
+    
+    Candidates from the LSH index are kept when their estimated Jaccard
+    similarity reaches SIMILARITY_THRESHOLD; articles with the same link are
+    always grouped. Groups are the connected components of those pairs.
+    
+    Returns:
+        List of clusters (lists of indices into `articles`, ascending), one per article group
+    """
+    parent = list(range(len(articles)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+    
+    signatures, has_signature = minhash_signatures(articles)
+    pairs = candidate_pairs(signatures, has_signature)
+    if len(pairs):
+        similarity = (signatures[:, pairs[:, 0]] == signatures[:, pairs[:, 1]]).mean(axis=0)
+        for i, j in pairs[similarity >= SIMILARITY_THRESHOLD].tolist():
+            union(i, j)
+    
+    first_with_link = {}
+    for position, article in enumerate(articles):
+        link = article.get("link")
+        if link:
+            union(first_with_link.setdefault(link, position), position)
+    
+    clusters = {}
+    for position in range(len(articles)):
+        clusters.setdefault(find(position), []).append(position)
+    return list(clusters.values())
+
+def deduplicate_articles(articles):
+    """
+    Keep one representative per cluster of near-duplicate stories.
+    
+    The representative is the copy with the longest content (the first of
+    those in input order), since it gives the best fallback summary. It gets
+    an 'alternate_sources' list of {"source", "link"} dicts for the other
+    sources that carried the story. Representatives keep their input order.
+    
+    Args:
+        articles: List of article dicts
+    
+    Returns:
+        List of representative articles
+    """
+    with stage("dedupe"):
+        representatives = []
+        for cluster in cluster_duplicates(articles):
+            if len(cluster) == 1:
+                representatives.append((cluster[0], articles[cluster[0]]))
+                continue
+            
+            best = max(cluster, key=lambda position: (len(articles[position].get("content", "")), -position))
+            representative = articles[best]
+            alternates = []
+            seen_sources = {representative.get("source")}
+            for position in cluster:
+                source = articles[position].get("source")
+                if source not in seen_sources:
+                    seen_sources.add(source)
+                    alternates.append({"source": source, "link": articles[position].get("link")})
+            representatives.append((best, with_fields(representative, alternate_sources=alternates)))
+        
+        count("duplicates_removed", len(articles) - len(representatives))
+        representatives.sort(key=lambda item: item[0])
+        return [article for _, article in representatives]
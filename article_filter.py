@@ -0,0 +1,318 @@
+import random
+import numpy as np
+from instrumentation import stage
+
+# Keywords used to find entertainment content for users with entertainment interests
+ENTERTAINMENT_KEYWORDS = ["movie", "film", "cinema", "tv", "television", "show", "celebrity",
+                          "music", "song", "album", "artist", "actor", "actress", "entertainment",
+                          "hollywood", "book", "novel", "author", "star", "concert", "festival",
+                          "award", "performance", "theater", "series", "streaming", "netflix",
+                          "disney", "hbo", "release", "premiere"]
+
+class ArticleIndex:
+    """
+    Inverted index over a batch of categorized articles.
+    
+    Maps lower-cased title, content and category tokens and sources to
+    article ids. Substring lookups scan the vocabulary instead of every
+    article and are memoized, so scoring a user is a few posting-list
+    lookups and sums. Build it once per article batch and reuse it for
+    every user.
+    """
+    
+    def __init__(self, articles):
+        self.articles = articles
+        self._fields = {"title": {}, "content": {}, "categories": {}}
+        self._category_postings = {}  # lower-cased category -> article ids (one per occurrence)
+        self._source_postings = {}  # lower-cased source -> article ids
+        self._memo = {}
+        
+        for article_id, article in enumerate(articles):
+            categories = [category.lower() for category in article.get("categories", [])]
+            texts = {
+                "title": article.get("title", "").lower(),
+                "content": article.get("content", "").lower(),
+                "categories": " ".join(categories),
+            }
+            for field, text in texts.items():
+                postings = self._fields[field]
+                for token in set(text.split()):
+                    postings.setdefault(token, []).append(article_id)
+            for category in categories:
+                self._category_postings.setdefault(category, []).append(article_id)
+            # Sources that carried the same story count as sources of the article
+            sources = {article.get("source", "").lower()}
+            sources.update(alternate["source"].lower() for alternate in article.get("alternate_sources") or ())
+            for source in sources:
+                self._source_postings.setdefault(source, []).append(article_id)
+    
+    def __len__(self):
+        return len(self.articles)
+    
+    def _text(self, article_id, field):
+        article = self.articles[article_id]
+        if field == "categories":
+            return " ".join(category.lower() for category in article.get("categories", []))
+        return article.get(field, "").lower()
+    
+    def containing(self, field, term):
+        """Return the ids of articles whose lower-cased `field` contains `term` as a substring."""
+        key = (field, term)
+        if key in self._memo:
+            return self._memo[key]
+        
+        postings = self._fields[field]
+        parts = term.split()
+        if len(parts) == 1 and parts[0] == term:
+            # A term without whitespace can only occur inside a single token
+            ids = set()
+            for token, token_ids in postings.items():
+                if term in token:
+                    ids.update(token_ids)
+        else:
+            # Every part must occur inside some token; verify candidates on the full text
+            candidates = None
+            for part in parts:
+                part_ids = self.containing(field, part)
+                candidates = set(part_ids) if candidates is None else candidates & part_ids
+            if candidates is None:
+                candidates = range(len(self.articles))
+            ids = {article_id for article_id in candidates if term in self._text(article_id, field)}
+        
+        ids = frozenset(ids)
+        self._memo[key] = ids
+        return ids
+    
+    def containing_any(self, field, terms):
+        """Return the ids of articles whose `field` contains at least one of `terms`."""
+        ids = set()
+        for term in terms:
+            ids |= self.containing(field, term)
+        return ids
+    
+    def containing_any_array(self, field, terms):
+        """Memoized NumPy array version of `containing_any`."""
+        key = (field, tuple(terms))
+        if key not in self._memo:
+            ids = self.containing_any(field, terms)
+            self._memo[key] = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        return self._memo[key]
+    
+    def incidence(self, field, terms):
+        """Return a (terms, articles) 0/1 float32 matrix of which articles' `field` contains each term."""
+        matrix = np.zeros((len(terms), len(self.articles)), dtype=np.float32)
+        for row, term in enumerate(terms):
+            matrix[row, list(self.containing(field, term))] = 1
+        return matrix
+    
+    def category_counts(self):
+        """Return (categories, (categories, articles) float32 matrix of occurrences), memoized."""
+        if "category_counts" not in self._memo:
+            categories = list(self._category_postings)
+            counts = np.zeros((len(categories), len(self.articles)), dtype=np.float32)
+            for row, category in enumerate(categories):
+                np.add.at(counts[row], self._category_postings[category], 1)
+            self._memo["category_counts"] = categories, counts
+        return self._memo["category_counts"]
+    
+    def source_incidence(self):
+        """Return (sources, (sources, articles) 0/1 float32 matrix), memoized."""
+        if "source_incidence" not in self._memo:
+            sources = list(self._source_postings)
+            incidence = np.zeros((len(sources), len(self.articles)), dtype=np.float32)
+            for row, source in enumerate(sources):
+                incidence[row, self._source_postings[source]] = 1
+            self._memo["source_incidence"] = sources, incidence
+        return self._memo["source_incidence"]
+    
+    def score(self, interests, sources, has_entertainment_interests):
+        """
+        Compute the relevance score of every article for one user.
+        
+        Args:
+            interests: Lower-cased user interests
+            sources: Lower-cased preferred sources
+            has_entertainment_interests: Whether to apply the entertainment keyword boost
+            
+        Returns:
+            NumPy array of scores, one per article
+        """
+        scores = np.zeros(len(self.articles), dtype=np.int64)
+        
+        # Category/interest match: 3 points per matching category
+        for category, article_ids in self._category_postings.items():
+            if any(interest in category or category in interest for interest in interests):
+                np.add.at(scores, article_ids, 3)
+        
+        # Interest in title (stronger match)
+        _add(scores, self.containing_any_array("title", interests), 4)
+        
+        # Interest in content, only for articles without a match so far
+        unmatched = scores == 0
+        _add(scores, self.containing_any_array("content", interests), 1, unmatched)
+        
+        # Source match, counted once per article
+        source_match = np.zeros(len(self.articles), dtype=bool)
+        for article_source, article_ids in self._source_postings.items():
+            if any(source in article_source or article_source in source for source in sources):
+                source_match[article_ids] = True
+        scores[source_match] += 2
+        
+        # Entertainment keywords for articles without any match: the first keyword
+        # found decides between a title/category match and a content match
+        if has_entertainment_interests:
+            pending = scores == 0
+            for keyword in ENTERTAINMENT_KEYWORDS:
+                if not pending.any():
+                    break
+                strong = self.containing("title", keyword) | self.containing("categories", keyword)
+                _add(scores, strong, 2, pending)
+                _add(scores, self.containing("content", keyword) - strong, 1, pending)
+                pending &= scores == 0
+        
+        return scores
+
+def _add(scores, article_ids, points, mask=None):
+    """Add `points` to the scores of `article_ids` (a set or array), restricted to `mask` if given."""
+    if not len(article_ids):
+        return
+    ids = article_ids
+    if not isinstance(ids, np.ndarray):
+        ids = np.fromiter(article_ids, dtype=np.int64, count=len(article_ids))
+    if mask is not None:
+        ids = ids[mask[ids]]
+    scores[ids] += points
+
+def user_terms(user_data):
+    """Return (interests, sources, has_entertainment_interests) for a user."""
+    interests = [interest.lower() for interest in user_data["interests"]]
+    sources = [source.lower() for source in user_data["sources"]]
+    has_entertainment_interests = any(interest in ENTERTAINMENT_KEYWORDS for interest in interests)
+    return interests, sources, has_entertainment_interests
+
+def _matches(users_terms, keys):
+    """(users, keys) 0/1 float32 matrix of users with a term that contains or is contained in each key."""
+    matrix = np.zeros((len(users_terms), len(keys)), dtype=np.float32)
+    for row, terms in enumerate(users_terms):
+        for column, key in enumerate(keys):
+            if any(term in key or key in term for term in terms):
+                matrix[row, column] = 1
+    return matrix
+
+def score_users(index, users):
+    """
+    Score many users against every indexed article in one pass.
+    
+    Each rule of ArticleIndex.score is applied to all users at once: the
+    users x (interests, categories or sources) matches are multiplied by the
+    matching (terms x articles) matrix of the index, and the entertainment
+    fallback walks its keywords once for every user. Each distinct interest
+    is looked up once, however many users share it.
+    
+    Returns:
+        NumPy array of shape (users, articles), equal to index.score per user
+    """
+    scores = np.zeros((len(users), len(index)), dtype=np.int64)
+    if not users or not len(index):
+        return scores
+    terms = [user_terms(user_data) for user_data in users]
+    
+    # Category/interest match: 3 points per matching category
+    categories, category_counts = index.category_counts()
+    if categories:
+        interest_matches = _matches([interests for interests, _, _ in terms], categories)
+        scores += 3 * (interest_matches @ category_counts).astype(np.int64)
+    
+    # Interest in title, then in content for articles without a match so far
+    vocabulary = sorted({interest for interests, _, _ in terms for interest in interests})
+    if vocabulary:
+        column = {interest: position for position, interest in enumerate(vocabulary)}
+        wants = np.zeros((len(users), len(vocabulary)), dtype=np.float32)
+        for row, (interests, _, _) in enumerate(terms):
+            wants[row, [column[interest] for interest in interests]] = 1
+        scores += 4 * (wants @ index.incidence("title", vocabulary) > 0)
+        scores += (scores == 0) & (wants @ index.incidence("content", vocabulary) > 0)
+    
+    # Source match, counted once per article
+    sources, source_incidence = index.source_incidence()
+    if sources:
+        scores += 2 * (_matches([user_sources for _, user_sources, _ in terms], sources) @ source_incidence > 0)
+    
+    # Entertainment keywords for articles without any match, as in ArticleIndex.score
+    pending = (scores == 0) & np.array([entertainment for _, _, entertainment in terms])[:, None]
+    for keyword in ENTERTAINMENT_KEYWORDS:
+        if not pending.any():
+            break
+        strong_ids = index.containing("title", keyword) | index.containing("categories", keyword)
+        strong = np.zeros(len(index), dtype=bool)
+        strong[list(strong_ids)] = True
+        weak = np.zeros(len(index), dtype=bool)
+        weak[list(index.containing("content", keyword) - strong_ids)] = True
+        scores += 2 * (pending & strong) + (pending & weak)
+        pending &= scores == 0
+    
+    return scores
+
+def select_articles(index, user_data, scores=None):
+    """
+    Pick the articles for one user.
+    
+    Args:
+        index: ArticleIndex over the article batch
+        user_data: User persona dict with 'interests' and 'sources'
+        scores: Precomputed scores of this user (see score_users)
+        
+    Returns:
+        Up to 15 (article id, relevance score) pairs, most relevant first;
+        the score is None for randomly sampled fallback articles
+    """
+    interests, sources, has_entertainment_interests = user_terms(user_data)
+    if scores is None:
+        scores = index.score(interests, sources, has_entertainment_interests)
+    
+    # Relevant articles in their original order, then sorted by relevance score;
+    # only the top 15 are ever returned
+    relevant = np.flatnonzero(scores > 0)
+    relevant = relevant[np.argsort(-scores[relevant], kind="stable")][:15]
+    selected = [(int(article_id), int(scores[article_id])) for article_id in relevant]
+    
+    # If we still have no articles, try a broader match (especially for entertainment)
+    if not selected and has_entertainment_interests:
+        broad = index.containing_any("title", ENTERTAINMENT_KEYWORDS) | index.containing_any("content", ENTERTAINMENT_KEYWORDS)
+        selected = [(article_id, 1) for article_id in sorted(broad)]
+    
+    # If still no articles, include some general articles
+    if not selected:
+        # Take a sample of recent articles
+        sample_size = min(10, len(index))
+        selected = [(article_id, None) for article_id in random.sample(range(len(index)), sample_size)]
+    
+    # Limit to top 15 articles
+    return selected[:15]
+
+def filter_articles_for_user(categorized_articles, user_data, index=None):
+    """
+    Filter articles based on user preferences with enhanced matching for entertainment content.
+    
+    Args:
+        categorized_articles: List of categorized article dicts
+        user_data: User persona dict with 'interests' and 'sources'
+        index: Optional ArticleIndex built over `categorized_articles`, reused across users
+        
+    Returns:
+        Up to 15 relevant articles, most relevant first; these are copies, so
+        the user's relevance scores and the summaries later stages add never
+        reach the shared `categorized_articles`
+    """
+    with stage("filter"):
+        if index is None or index.articles is not categorized_articles:
+            index = ArticleIndex(categorized_articles)
+        
+        filtered_articles = []
+        for article_id, relevance_score in select_articles(index, user_data):
+            article = categorized_articles[article_id].copy()
+            if relevance_score is not None:
+                article["relevance_score"] = relevance_score
+            filtered_articles.append(article)
+        
+        return filtered_articles
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from article_record import ArticleRecord
+
+# Default location of the article database
+ARTICLE_DB_PATH = os.path.join(".cache", "articles.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    published TEXT NOT NULL,
+    content TEXT NOT NULL,
+    source TEXT NOT NULL,
+    feed_category TEXT NOT NULL,
+    categories TEXT,
+    summary TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, published);
+CREATE INDEX IF NOT EXISTS idx_articles_last_seen ON articles (last_seen);
+CREATE TABLE IF NOT EXISTS article_categories (
+    article_id TEXT NOT NULL REFERENCES articles (id),
+    category TEXT NOT NULL,
+    PRIMARY KEY (category, article_id)
+);
+"""
+
+def article_id(article):
+    """Return the store key of an article: its GUID, or its link if it has none."""
+    return article.get("guid") or article["link"]
+
+class ArticleStore:
+    """
+    SQLite-backed store of deduplicated articles.
+    
+    Articles are keyed by GUID/link. Categories and summaries are stored next
+    to each row so a refresh only has to process articles it has not seen.
+    """
+    
+    def __init__(self, path=ARTICLE_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+    
+    def close(self):
+        self._conn.close()
+    
+    def touch(self, ids, seen_at=None):
+        """
+        Mark articles as seen in the current refresh.
+        
+        Returns:
+            Set of the given ids that are already stored
+        """
+        ids = list(ids)
+        if not ids:
+            return set()
+        seen_at = (seen_at or datetime.now()).isoformat()
+        placeholders = ",".join("?" * len(ids))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE articles SET last_seen = ? WHERE id IN ({placeholders})", [seen_at] + ids
+            )
+            rows = self._conn.execute(f"SELECT id FROM articles WHERE id IN ({placeholders})", ids)
+            return {row["id"] for row in rows}
+    
+    def add_articles(self, articles, seen_at=None):
+        """
+        Insert articles that are not stored yet.
+        
+        Returns:
+            List of the articles that were new
+        """
+        seen_at = (seen_at or datetime.now()).isoformat()
+        new_articles = []
+        with self._lock, self._conn:
+            for article in articles:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO articles (id, title, link, published, content, source, "
+                    "feed_category, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (article_id(article), article["title"], article["link"],
+                     article["published"].isoformat(), article["content"], article["source"],
+                     article["feed_category"], seen_at, seen_at)
+                )
+                if cursor.rowcount:
+                    new_articles.append(article)
+        return new_articles
+    
+    def set_categories(self, articles):
+        """Store the categories assigned to each article."""
+        with self._lock, self._conn:
+            for article in articles:
+                key = article_id(article)
+                categories = article.get("categories") or []
+                self._conn.execute(
+                    "UPDATE articles SET categories = ? WHERE id = ?", (json.dumps(categories), key)
+                )
+                self._conn.execute("DELETE FROM article_categories WHERE article_id = ?", (key,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO article_categories (article_id, category) VALUES (?, ?)",
+                    [(key, category) for category in categories]
+                )
+    
+    def set_summaries(self, articles):
+        """Store the summary of each article that has one."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE articles SET summary = ? WHERE id = ?",
+                [(article["summary"], article_id(article)) for article in articles if article.get("summary")]
+            )
+    
+    def get_summaries(self, articles):
+        """Return {article id: summary} for the given articles that have a stored summary."""
+        ids = [article_id(article) for article in articles]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, summary FROM articles WHERE summary IS NOT NULL AND id IN ({placeholders})", ids
+            ).fetchall()
+        return {row["id"]: row["summary"] for row in rows}
+    
+    def query(self, category=None, source=None, since=None, seen_since=None, limit=None):
+        """
+        Return stored articles, newest first.
+        
+        Args:
+            category: Only articles assigned to this category
+            source: Only articles from this source
+            since: Only articles published at or after this datetime
+            seen_since: Only articles present in a feed at or after this datetime
+            limit: Maximum number of articles to return
+        """
+        sql = "SELECT a.* FROM articles a"
+        clauses = []
+        params = []
+        if category:
+            sql += " JOIN article_categories c ON c.article_id = a.id AND c.category = ?"
+            params.append(category)
+        if source:
+            clauses.append("a.source = ?")
+            params.append(source)
+        if since:
+            clauses.append("a.published >= ?")
+            params.append(since.isoformat())
+        if seen_since:
+            clauses.append("a.last_seen >= ?")
+            params.append(seen_since.isoformat())
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY a.published DESC, a.rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_article(row) for row in rows]
+    
+    @staticmethod
+    def _to_article(row):
+        article = ArticleRecord(
+            title=row["title"],
+            link=row["link"],
+            guid=row["id"],
+            published=datetime.fromisoformat(row["published"]),
+            content=row["content"],
+            source=row["source"],
+            feed_category=row["feed_category"],
+            categories=json.loads(row["categories"]) if row["categories"] else [],
+        )
+        if row["summary"]:
+            article["summary"] = row["summary"]
+        return article
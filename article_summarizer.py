@@ -1,14 +1,38 @@
-import newspaper
-import nltk
-from newspaper import Article
 import time
 import re
+import threading
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from article_store import article_id
+from article_record import with_fields, writable
+from instrumentation import count, stage, timer
+from worker_pools import discard_pool, shared_pool
 
-# Initialize NLTK 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+# Defaults for the parallel summarization mode
+SUMMARY_WORKERS = 8  # Concurrent article downloads
+ARTICLE_DEADLINE = 15  # Seconds allowed per article before falling back to the feed content
+SUMMARY_BUDGET = 20  # Seconds "Generate Newsletter" waits for summaries before using feed snippets for the rest
+# "local" summarizes long enough feed content without downloading the page; "download" always downloads
+SUMMARY_MODES = ("local", "download")
+SUMMARY_MODE = "local"
+LOCAL_MIN_CHARS = 400  # Feed content shorter than this is summarized from the downloaded page
+
+# NLTK and newspaper are slow to import, so they are loaded by the first summary
+_nltk_lock = threading.Lock()
+_punkt_checked = False
+
+def load_nltk():
+    """Import NLTK, downloading the punkt tokenizer the first time it is missing."""
+    global _punkt_checked
+    import nltk
+    with _nltk_lock:
+        if not _punkt_checked:
+            try:
+                nltk.data.find('tokenizers/punkt')
+            except LookupError:
+                nltk.download('punkt')
+            _punkt_checked = True
+    return nltk
 
 def clean_summary(text):
     """Clean and format the summary text."""
@@ -21,6 +45,93 @@ def clean_summary(text):
         
     return text
 
+def content_summary(content, ellipsis_if_short=False):
+    """Fallback summary built from the feed content."""
+    if len(content) > 250 or ellipsis_if_short:
+        return content[:250] + "..."
+    return content
+
+def sentence_summary(content):
+    """Fallback summary from the first few sentences of the feed content."""
+    sentences = load_nltk().sent_tokenize(content)
+    if sentences and len(sentences) >= 3:
+        return " ".join(sentences[:3])
+    elif sentences:
+        return " ".join(sentences)
+    return content[:250] + "..."
+
+def download_html(link, timeout=10):
+    """Download the page of an article and return its HTML."""
+    from newspaper import Article
+    from newspaper.article import ArticleDownloadState
+    article = Article(link)
+    article.config.browser_user_agent = 'Mozilla/5.0'
+    article.config.request_timeout = timeout
+    article.download()
+    if article.download_state != ArticleDownloadState.SUCCESS:
+        raise RuntimeError(f"Download failed: {link}")
+    return article.html
+
+def nlp_summary(link, html):
+    """
+    Parse downloaded HTML and summarize it with newspaper's NLP.
+    
+    Runs in a worker process in parallel mode, so it only takes and returns
+    plain strings. Raises if the page cannot be parsed; returns None if only
+    the NLP step fails.
+    """
+    from newspaper import Article
+    load_nltk()
+    article = Article(link)
+    article.download(input_html=html)
+    article.parse()
+    try:
+        article.nlp()
+        return article.summary
+    except Exception:
+        return None
+
+def fallback_summary(result, reason, ellipsis_if_short=False):
+    """Use the feed content as the summary, count why and mark it with 'summary_fallback'."""
+    count("summary_fallbacks", reason=reason)
+    count("summary_sources", source="feed_content")
+    result["summary"] = content_summary(result.get("content", ""), ellipsis_if_short)
+    result["summary_fallback"] = reason
+    return result
+
+def degraded_summary(article_data):
+    """
+    Feed content snippet for an article the time budget did not reach, marked with 'summary_degraded'.
+    
+    Always a copy: a worker that is still summarizing the article may write to the original record.
+    """
+    result = article_data.copy()
+    result["summary_degraded"] = True
+    return fallback_summary(result, "time_budget")
+
+def finish_summary(result, summary):
+    """Apply the fallback chain to an NLP summary (or None) and store it in `result`."""
+    content = result["content"]
+    source = "nlp"
+    
+    # If summary is missing, too short or empty, use the first few sentences of the content
+    if summary is None or len(summary) < 100:
+        summary = sentence_summary(content)
+        source = "first_sentences"
+            
+    # Clean and format the summary
+    summary = clean_summary(summary)
+            
+    # If summary is still empty or too short, use the original content
+    if not summary or len(summary) < 50:
+        summary = content_summary(content)
+        source = "feed_content"
+    count("summary_sources", source=source)
+            
+    # Add the summary to the article data
+    result["summary"] = summary
+    return result
+
 def summarize_article(article_data):
     """
     Summarize an article using the newspaper3k library.
@@ -31,88 +142,280 @@ def summarize_article(article_data):
     Returns:
         Updated article_data with summary field added
     """
-    # Create a copy of the article data to avoid modifying the original
-    result = dict(article_data)
+    # Records are updated in place; dicts are copied to avoid modifying the original
+    result = writable(article_data)
     
+    # Only attempt to summarize if we have a valid URL
+    if not result.get("link"):
+        return fallback_summary(result, "no_link", ellipsis_if_short=True)
+    
+    link = result["link"]
+    step = "download"
     try:
-        # Only attempt to summarize if we have a valid URL
-        if not result.get("link"):
-            result["summary"] = result.get("content", "")[:250] + "..."
-            return result
+        with timer("summary_seconds", detail=link):
+            # Download and parse the article
+            with timer("summary_step_seconds", detail=link, step="download"):
+                html = download_html(link)
+            time.sleep(0.2)  # Small delay to avoid hitting rate limits
             
-        # Create a newspaper Article object
-        article = Article(result["link"])
+            step = "nlp"
+            with timer("summary_step_seconds", detail=link, step="nlp"):
+                summary = nlp_summary(link, html)
+            step = "finish"
+            finish_summary(result, summary)
         
-        # Configure article download
-        article.config.browser_user_agent = 'Mozilla/5.0'
-        article.config.request_timeout = 10
+    except Exception:
+        # If there's an error, use the content as the summary
+        fallback_summary(result, f"{step}_failed")
+    
+    return result
+
+def local_summaries(articles, min_chars=LOCAL_MIN_CHARS):
+    """
+    Summarize articles from their feed content alone, scoring sentences in one batch.
+    
+    Returns:
+        One summarized article per input, or None where the content is too
+        thin and the page has to be downloaded
+    """
+    from extractive_summarizer import extractive_summaries, is_summarizable
+    eligible = [position for position, article in enumerate(articles)
+                if is_summarizable(article.get("content", ""), min_chars)]
+    summaries = extractive_summaries([articles[position]["content"] for position in eligible])
+    
+    results = [None] * len(articles)
+    for position, summary in zip(eligible, summaries):
+        if summary:
+            result = writable(articles[position])
+            result["summary"] = clean_summary(summary)
+            count("summary_sources", source="local")
+            results[position] = result
+    return results
+
+def download_savings(metrics):
+    """
+    Downloads avoided by local summaries and the latency that saved.
+    
+    The saving is estimated from the mean time of the articles that were
+    downloaded, minus the time spent summarizing locally; it adds up
+    per-article latency, so with concurrent downloads it exceeds the wall time saved.
+    
+    Args:
+        metrics: METRICS.snapshot()
+    """
+    downloads = {counter["labels"].get("result"): counter["value"]
+                 for counter in metrics["counters"] if counter["name"] == "summary_downloads"}
+    avoided, needed = downloads.get("avoided", 0), downloads.get("needed", 0)
+    timers = {(timer["name"], timer["labels"].get("step")): timer for timer in metrics["timers"]}
+    downloaded = timers.get(("summary_seconds", None))
+    local = timers.get(("summary_step_seconds", "local"))
+    seconds_saved = None
+    if downloaded:
+        seconds_saved = avoided * downloaded["mean_s"] - (local["total_s"] if local else 0)
+    return {
+        "avoided": avoided,
+        "downloaded": needed,
+        "avoidance_rate": avoided / (avoided + needed) if avoided + needed else None,
+        "seconds_saved": seconds_saved,
+    }
+
+def _iter_in_workers(articles, workers, nlp_workers, deadline, deadline_at=None):
+    """
+    Summarize articles with concurrent downloads and NLP in a process pool.
+    
+    Yields (position, summarized article) pairs in completion order. Each
+    article gets `deadline` seconds from the moment a worker picks it up;
+    when it runs out the fallback chain is used instead. At `deadline_at`
+    (time.monotonic()) articles that are not finished are cancelled or left
+    to their workers, and yielded with degraded summaries without waiting.
+    """
+    # Long-lived and shared by every request; see worker_pools
+    process_pool = shared_pool("nlp", nlp_workers)
+    
+    def summarize_one(article_data):
+        result = writable(article_data)
+        if not result.get("link"):
+            return fallback_summary(result, "no_link", ellipsis_if_short=True)
+        link = result["link"]
+        with timer("summary_seconds", detail=link):
+            return summarize_link(result, link)
+    
+    def summarize_link(result, link):
+        started = time.monotonic()
+        allowed = deadline if deadline_at is None else max(0, min(deadline, deadline_at - started))
+        # Whether the time budget, not the article's own limits, shortened the download or the NLP step
+        download_cut = deadline_at is not None and allowed < min(10, deadline)
+        nlp_cut = deadline_at is not None and allowed < deadline
+        try:
+            with timer("summary_step_seconds", detail=link, step="download"):
+                html = download_html(link, timeout=min(10, allowed))
+        except Exception:
+            if download_cut:
+                return degraded_summary(result)
+            return fallback_summary(result, "download_failed")
         
-        # Download and parse the article
-        article.download()
-        time.sleep(0.2)  # Small delay to avoid hitting rate limits
-        article.parse()
+        # Includes the time spent waiting for a free NLP process
+        with timer("summary_step_seconds", detail=link, step="nlp"):
+            try:
+                future = process_pool.submit(nlp_summary, link, html)
+                summary = future.result(timeout=max(0, allowed - (time.monotonic() - started)))
+            except FutureTimeoutError:
+                # Out of time: treat like a failed NLP step
+                future.cancel()
+                if nlp_cut:
+                    return degraded_summary(result)
+                count("summary_fallbacks", reason="deadline")
+                result["summary_fallback"] = "deadline"
+                summary = None
+            except BrokenExecutor:
+                discard_pool(process_pool)
+                return fallback_summary(result, "nlp_failed")
+            except Exception:
+                return fallback_summary(result, "nlp_failed")
         
-        # Try to use NLP to summarize
         try:
-            article.nlp()
-            summary = article.summary
-            
-            # If summary is too short or empty, use the first few sentences of the content
-            if len(summary) < 100:
-                # Use the first 2-3 sentences from the content
-                sentences = nltk.sent_tokenize(result["content"])
-                if sentences and len(sentences) >= 3:
-                    summary = " ".join(sentences[:3])
-                elif sentences:
-                    summary = " ".join(sentences)
-                else:
-                    summary = result["content"][:250] + "..."
+            return finish_summary(result, summary)
         except Exception:
-            # If NLP fails, use the first few sentences of the content
-            sentences = nltk.sent_tokenize(result["content"])
-            if sentences and len(sentences) >= 3:
-                summary = " ".join(sentences[:3])
-            elif sentences:
-                summary = " ".join(sentences)
+            return fallback_summary(result, "finish_failed")
+    
+    download_pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {download_pool.submit(summarize_one, article): position
+                   for position, article in enumerate(articles)}
+        pending = set(futures)
+        timeout = None if deadline_at is None else max(0, deadline_at - time.monotonic())
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                pending.discard(future)
+                yield futures[future], future.result()
+        except FutureTimeoutError:
+            # Out of time: keep what finished meanwhile and degrade the rest, in input order
+            for future in sorted(pending, key=futures.get):
+                if future.done() and not future.cancelled():
+                    yield futures[future], future.result()
+                else:
+                    future.cancel()
+                    yield futures[future], degraded_summary(articles[futures[future]])
+    finally:
+        # Do not wait for downloads that already ran out of time; their NLP tasks were cancelled
+        download_pool.shutdown(wait=deadline_at is None, cancel_futures=True)
+
+def iter_summaries(articles, store=None, workers=None, nlp_workers=None, deadline=ARTICLE_DEADLINE,
+                   cache=None, mode=SUMMARY_MODE, min_local_chars=LOCAL_MIN_CHARS, time_budget=None):
+    """
+    Summarize articles, yielding each one as soon as its summary is ready.
+    
+    Takes the same arguments as summarize_articles. Articles with neither a
+    link nor a GUID come first with their feed content, then cached and stored
+    summaries, then local summaries, then downloaded ones in
+    completion order (input order in serial mode). The "summarize" stage timing covers the whole stream,
+    including time the consumer spends between items. The time budget
+    starts with the first item requested.
+    
+    Yields:
+        (position in `articles`, summarized article) pairs
+    """
+    with stage("summarize"):
+        deadline_at = None if time_budget is None else time.monotonic() + time_budget
+        # Without a link or GUID an article has no store key and nothing to download
+        keyed = []
+        for position, article in enumerate(articles):
+            if article.get("guid") or article.get("link"):
+                keyed.append(position)
             else:
-                summary = result["content"][:250] + "..."
-                
-        # Clean and format the summary
-        summary = clean_summary(summary)
-                
-        # If summary is still empty or too short, use the original content
-        if not summary or len(summary) < 50:
-            if len(result["content"]) > 250:
-                summary = result["content"][:250] + "..."
+                yield position, summarize_article(article)
+        
+        # Look up summaries in the cache first, then in the store
+        stored = {}
+        if cache:
+            for position in keyed:
+                summary = cache.get(articles[position])
+                if summary:
+                    stored[article_id(articles[position])] = summary
+            count("summary_sources", len(stored), source="cache")
+        if store:
+            missing = [articles[position] for position in keyed if article_id(articles[position]) not in stored]
+            from_store = store.get_summaries(missing)
+            count("summary_sources", len(from_store), source="store")
+            stored.update(from_store)
+        
+        pending = []
+        for position in keyed:
+            article = articles[position]
+            summary = stored.get(article_id(article))
+            if summary:
+                yield position, with_fields(article, summary=summary)
             else:
-                summary = result["content"]
-                
-        # Add the summary to the article data
-        result["summary"] = summary
+                pending.append(position)
+        if not pending:
+            return
         
-    except Exception:
-        # If there's an error, use the content as the summary
-        content = result.get("content", "")
-        if content and len(content) > 250:
-            result["summary"] = content[:250] + "..."
+        def save(summarized_article):
+            # Only NLP and local summaries are kept; after a failed or timed-out
+            # download (or a degraded summary) the next request tries the article again
+            if summarized_article.get("summary_fallback"):
+                return
+            if store:
+                store.set_summaries([summarized_article])
+            if cache:
+                cache.put(summarized_article, summarized_article["summary"])
+        
+        if mode == "local":
+            with timer("summary_step_seconds", step="local"):
+                local = local_summaries([articles[position] for position in pending], min_local_chars)
+            downloads = []
+            for position, summarized_article in zip(pending, local):
+                if summarized_article is None:
+                    downloads.append(position)
+                else:
+                    save(summarized_article)
+                    yield position, summarized_article
+            count("summary_downloads", len(pending) - len(downloads), result="avoided")
+            pending = downloads
+            if not pending:
+                return
+        count("summary_downloads", len(pending), result="needed")
+        
+        pending_articles = [articles[position] for position in pending]
+        if workers:
+            results = _iter_in_workers(pending_articles, workers, nlp_workers, deadline, deadline_at)
         else:
-            result["summary"] = content
-    
-    return result
+            # An article that was started is finished; the budget is checked between articles
+            results = ((index, summarize_article(article)
+                        if deadline_at is None or time.monotonic() < deadline_at else degraded_summary(article))
+                       for index, article in enumerate(pending_articles))
+        
+        for index, summarized_article in results:
+            save(summarized_article)
+            yield pending[index], summarized_article
 
-def summarize_articles(articles):
+def summarize_articles(articles, store=None, workers=None, nlp_workers=None, deadline=ARTICLE_DEADLINE,
+                       cache=None, mode=SUMMARY_MODE, min_local_chars=LOCAL_MIN_CHARS, time_budget=None):
     """
     Summarize a list of articles.
     
     Args:
         articles: List of article dictionaries
+        store: Optional ArticleStore; stored summaries are reused and new ones saved
+            (feed content fallbacks are neither saved nor cached)
+        workers: Number of concurrent downloads; None summarizes one article at a time
+        nlp_workers: Number of processes running the NLP step (parallel mode, defaults to CPU count)
+        deadline: Seconds allowed per article before falling back (parallel mode)
+        cache: Optional SummaryCache, checked before anything is downloaded
+        mode: "local" summarizes feed content of at least `min_local_chars`
+            characters without a download; "download" always downloads the page
+        min_local_chars: Shortest feed content summarized locally
+        time_budget: Optional seconds the whole call may take. Downloads are
+            started in input order, so pass the most relevant articles first;
+            articles not summarized in time get the feed content snippet and
+            'summary_degraded' set, and are neither cached nor stored
         
     Returns:
-        List of articles with summaries added
+        List of articles with summaries added, in input order
     """
-    summarized = []
-    for article in articles:
-        summarized_article = summarize_article(article)
-        summarized.append(summarized_article)
+    summarized = [None] * len(articles)
+    for position, summarized_article in iter_summaries(articles, store, workers, nlp_workers, deadline, cache,
+                                                          mode, min_local_chars, time_budget):
+        summarized[position] = summarized_article
     
     return summarized
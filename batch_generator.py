@@ -0,0 +1,73 @@
+from article_categorizer import categorize_articles
+from article_deduplicator import deduplicate_articles
+from article_filter import ArticleIndex, score_users, select_articles
+from article_store import article_id
+from article_summarizer import SUMMARY_MODE, SUMMARY_WORKERS, summarize_articles
+from newsletter_generator import generate_newsletter
+from rss_parser import fetch_rss_feeds
+from user_preferences import USER_PERSONAS
+
+def select_for_users(articles, users, index=None):
+    """
+    Select the articles of many users in one scoring pass.
+    
+    Returns:
+        One list of (article id, relevance score) pairs per user
+    """
+    if index is None or index.articles is not articles:
+        index = ArticleIndex(articles)
+    scores = score_users(index, users)
+    return [select_articles(index, user_data, user_scores) for user_data, user_scores in zip(users, scores)]
+
+def generate_newsletters(users=None, articles=None, store=None, cache=None, workers=SUMMARY_WORKERS,
+                         fmt="markdown", summary_mode=SUMMARY_MODE, category_cache=None):
+    """
+    Generate newsletters for many users in one pipeline run.
+    
+    Feeds are fetched and categorized once, all users are scored against all
+    articles in one pass, and the union of selected articles is summarized
+    only once before every newsletter is rendered.
+    
+    Args:
+        users: List of user persona dicts (defaults to every persona in USER_PERSONAS)
+        articles: Categorized (and deduplicated) articles to use instead of fetching the feeds
+        store: Optional ArticleStore passed to summarize_articles
+        cache: Optional SummaryCache passed to summarize_articles
+        workers: Concurrent downloads for summarization (None for serial)
+        fmt: "markdown", "html" or "text"
+        summary_mode: "local" or "download", passed to summarize_articles as `mode`
+        category_cache: Optional CategoryCache used when the feeds are fetched here
+        
+    Returns:
+        Dict of {user name: rendered newsletter}
+    """
+    if users is None:
+        users = list(USER_PERSONAS.values())
+    if articles is None:
+        articles = deduplicate_articles(categorize_articles(fetch_rss_feeds(concurrent=True), batch=True,
+                                                                  cache=category_cache))
+    if not articles:
+        return {}
+    
+    selections = select_for_users(articles, users)
+    
+    # Summarize each selected article once, however many users picked it
+    unique = {}
+    for selection in selections:
+        for index, _ in selection:
+            unique.setdefault(article_id(articles[index]), articles[index])
+    summarized = summarize_articles(list(unique.values()), store=store, cache=cache, workers=workers,
+                                    mode=summary_mode)
+    summaries = {article_id(article): article for article in summarized}
+    
+    newsletters = {}
+    for user_data, selection in zip(users, selections):
+        user_articles = []
+        for index, relevance_score in selection:
+            article = dict(summaries[article_id(articles[index])])
+            if relevance_score is not None:
+                article["relevance_score"] = relevance_score
+            user_articles.append(article)
+        newsletters[user_data["name"]] = generate_newsletter(user_articles, user_data, fmt=fmt)
+    
+    return newsletters
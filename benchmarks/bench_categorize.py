@@ -0,0 +1,106 @@
+"""
+Throughput of `categorize_article` against the previous substring-scanning version,
+and of the batch mode of `categorize_articles`, and of a refresh served from the
+category cache (all hits, and after adding a keyword).
+
+Run from the repository root:
+    python -m benchmarks.bench_categorize [--articles 2000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import article_categorizer
+from article_categorizer import (
+    CATEGORIES, categorize_article, categorize_articles, preprocess_text, rank_categories
+)
+from benchmarks.fixtures import make_articles
+from category_cache import CategoryCache
+
+
+def legacy_categorize_article(article):
+    """The substring-scanning categorizer this benchmark compares against."""
+    title = article.get("title", "")
+    text = title + " " + article.get("content", "")
+    preprocessed_text = preprocess_text(text)
+    category_scores = {}
+    for category, keywords in CATEGORIES.items():
+        score = 0
+        for keyword in keywords:
+            keyword_count = preprocessed_text.count(keyword)
+            if title and keyword in preprocess_text(title):
+                score += 5 * keyword_count
+            else:
+                score += keyword_count
+        if score > 0:
+            category_scores[category] = score
+    return dict(article, categories=rank_categories(category_scores, article.get("feed_category", "")))
+
+
+def throughput(func, articles, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(article) for article in articles]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(articles) / best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    articles = make_articles(args.articles, seed=42)
+    legacy_rate, legacy = throughput(legacy_categorize_article, articles, args.repeat)
+    matcher_rate, matched = throughput(categorize_article, articles, args.repeat)
+    same = sum(a["categories"] == b["categories"] for a, b in zip(legacy, matched))
+
+    start = time.perf_counter()
+    batched = categorize_articles(articles, batch=True)
+    batch_rate = len(articles) / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "categories.db")
+        cache = CategoryCache(path)
+        categorize_articles(articles, cache=cache)
+        start = time.perf_counter()
+        cached = categorize_articles(articles, cache=CategoryCache(path))
+        warm_rate = len(articles) / (time.perf_counter() - start)
+
+        # A new keyword only invalidates the articles that contain it
+        edited = {category: list(keywords) for category, keywords in CATEGORIES.items()}
+        edited["Science"].append("telescope")
+        original_matcher = article_categorizer.MATCHER
+        article_categorizer.MATCHER = article_categorizer.KeywordMatcher(edited)
+        try:
+            cache = CategoryCache(path, matcher=article_categorizer.MATCHER)
+            start = time.perf_counter()
+            categorize_articles(articles, cache=cache)
+            edited_rate = len(articles) / (time.perf_counter() - start)
+            edited_lookup = cache.last_lookup
+        finally:
+            article_categorizer.MATCHER = original_matcher
+
+    print(json.dumps({
+        "articles": len(articles),
+        "legacy_articles_per_s": round(legacy_rate),
+        "matcher_articles_per_s": round(matcher_rate),
+        "speedup": round(matcher_rate / legacy_rate, 2),
+        "batch_articles_per_s": round(batch_rate),
+        "batch_matches_per_article": all(a["categories"] == b["categories"] for a, b in zip(matched, batched)),
+        "cached_articles_per_s": round(warm_rate),
+        "cached_matches_per_article": all(a["categories"] == b["categories"] for a, b in zip(matched, cached)),
+        "after_keyword_edit_articles_per_s": round(edited_rate),
+        "after_keyword_edit_hit_rate": round(edited_lookup["hit_rate"], 3),
+        # Results differ where the old substring scan matched inside words
+        "same_categories_ratio": round(same / len(articles), 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
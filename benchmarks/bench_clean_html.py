@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of `rss_parser.clean_html` against the previous two-regex cleaner.
+
+Uses WordPress-style fixture bodies by default; pass saved feeds (RSS/Atom files)
+to benchmark on real `content:encoded` bodies:
+    python -m benchmarks.bench_clean_html [--feeds saved/*.xml] [--repeat 20]
+
+Also checks that capped cleaning returns the uncapped result cut to the cap,
+on the bodies and on edge cases around the cleaning window; the run exits
+with status 1 otherwise.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+import feedparser
+
+from benchmarks.fixtures import TOPICS, make_html_body
+from rss_parser import MAX_CONTENT_LENGTH, clean_html
+
+
+def legacy_clean_html(raw_html):
+    """The cleaner this benchmark compares against."""
+    clean_regex = re.compile('<.*?>')
+    clean_text = re.sub(clean_regex, '', raw_html)
+    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+    return clean_text
+
+
+def feed_bodies(paths):
+    """Raw entry bodies, as parse_feed reads them, from saved feed files."""
+    bodies = []
+    for path in paths:
+        for entry in feedparser.parse(path).entries:
+            if entry.get("content"):
+                bodies.append(entry.content[0].value)
+            elif entry.get("summary"):
+                bodies.append(entry.summary)
+    return bodies
+
+
+def fixture_bodies(count):
+    rng = random.Random(3)
+    bodies = [make_html_body(rng, TOPICS["Technology"], paragraphs=rng.randint(2, 12)) for _ in range(count)]
+    # A few very large bodies, like long-form content:encoded blocks
+    bodies += [make_html_body(rng, TOPICS["Science"], paragraphs=800) for _ in range(max(1, count // 100))]
+    return bodies
+
+
+# Bodies whose first tag, entity or hidden block straddles the cleaning window of small caps
+EDGE_CASES = [
+    "<br/>word &amp; ",
+    "<p class='lead'>word</p>",
+    "  &#8217;word",
+    "&CounterClockwiseContourIntegral; word",
+    "<script>var x = 1;</script>word",
+    "<!-- a comment -->word <b>bold</b>",
+    "word&amp;word&lt;word",
+]
+
+
+def capped_mismatches(bodies, caps=(1, 2, 5, 13, 100, MAX_CONTENT_LENGTH)):
+    """(body, cap) pairs where clean_html(body, cap) is not the uncapped result cut to the cap."""
+    mismatches = []
+    for body in bodies:
+        clean_text = clean_html(body)
+        for cap in caps:
+            if clean_html(body, cap) != clean_text[:cap].rstrip():
+                mismatches.append((body[:80], cap))
+    return mismatches
+
+
+def run(func, bodies, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for body in bodies:
+            func(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--feeds", nargs="*", default=[], help="saved RSS/Atom files")
+    parser.add_argument("--bodies", type=int, default=500, help="fixture bodies when no feeds are given")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    bodies = feed_bodies(args.feeds) if args.feeds else fixture_bodies(args.bodies)
+    megabytes = sum(len(body) for body in bodies) / 2**20
+
+    legacy = run(legacy_clean_html, bodies, args.repeat)
+    cleaner = run(clean_html, bodies, args.repeat)
+    capped = run(lambda body: clean_html(body, MAX_CONTENT_LENGTH), bodies, args.repeat)
+    mismatches = capped_mismatches(EDGE_CASES + bodies)
+
+    print(json.dumps({
+        "bodies": len(bodies),
+        "input_mb": round(megabytes, 2),
+        "legacy_mb_per_s": round(megabytes / legacy, 1),
+        "clean_html_mb_per_s": round(megabytes / cleaner, 1),
+        "clean_html_capped_mb_per_s": round(megabytes / capped, 1),
+        "max_content_length": MAX_CONTENT_LENGTH,
+        "capped_mismatches": mismatches[:10],
+    }, indent=2))
+
+    if mismatches:
+        print(f"FAILED: {len(mismatches)} capped results differ from the uncapped result cut to the cap",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure near-duplicate clustering on corpora with injected wire-story copies:
+time and throughput per size (to check that it scales near-linearly), the
+share of injected copies found and the number of wrongly merged stories.
+
+Run from the repository root:
+    python -m benchmarks.bench_dedupe [--sizes 10000 100000] [--duplicates 0.1]
+"""
+import argparse
+import json
+import random
+import time
+
+from article_deduplicator import cluster_duplicates, deduplicate_articles
+from article_record import ArticleRecord
+from benchmarks.fixtures import make_articles
+
+COPY_SOURCES = ["Reuters", "AP News", "The Verge", "New York Times"]
+
+
+def make_corpus(count, duplicate_share, seed=11):
+    """
+    Articles plus reworded copies of some of them from other sources.
+
+    Returns:
+        (articles, story id of every article)
+    """
+    rng = random.Random(seed)
+    articles = [ArticleRecord(article) for article in make_articles(count, seed=seed)]
+    stories = list(range(count))
+    for copy in range(int(count * duplicate_share)):
+        story = rng.randrange(count)
+        original = articles[story]
+        words = original["content"].split()
+        # A copy edits a few words and the headline
+        for _ in range(3):
+            words[rng.randrange(len(words))] = rng.choice(["reportedly", "officials", "said", "new"])
+        articles.append(ArticleRecord(dict(
+            original,
+            title=f"{original['title']} - update",
+            content=" ".join(words),
+            link=f"https://copies.example.com/{copy}",
+            source=rng.choice(COPY_SOURCES),
+        )))
+        stories.append(story)
+    return articles, stories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--duplicates", type=float, default=0.1, help="injected copies per original article")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        articles, stories = make_corpus(size, args.duplicates)
+        start = time.perf_counter()
+        clusters = cluster_duplicates(articles)
+        elapsed = time.perf_counter() - start
+
+        cluster_of = {}
+        for cluster_id, cluster in enumerate(clusters):
+            for position in cluster:
+                cluster_of[position] = cluster_id
+        copies = range(size, len(articles))
+        found = sum(cluster_of[position] == cluster_of[stories[position]] for position in copies)
+        wrongly_merged = sum(len({stories[position] for position in cluster}) - 1 for cluster in clusters)
+
+        start = time.perf_counter()
+        representatives = deduplicate_articles(articles)
+        dedupe_time = time.perf_counter() - start
+
+        results[size] = {
+            "articles": len(articles),
+            "cluster_s": round(elapsed, 3),
+            "articles_per_s": round(len(articles) / elapsed),
+            "deduplicate_s": round(dedupe_time, 3),
+            "representatives": len(representatives),
+            "copies_found": round(found / max(len(copies), 1), 3),
+            "stories_wrongly_merged": wrongly_merged,
+        }
+    sizes = sorted(results)
+    if len(sizes) > 1:
+        results["time_ratio_per_size_ratio"] = round(
+            (results[sizes[-1]]["cluster_s"] / results[sizes[0]]["cluster_s"]) / (sizes[-1] / sizes[0]), 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
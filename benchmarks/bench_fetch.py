@@ -0,0 +1,71 @@
+"""
+Compare serial and concurrent `fetch_rss_feeds` against local stand-in feed hosts,
+and a warm refresh through the conditional-GET feed cache.
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch [--latency 0.2] [--items 10]
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import rss_parser
+from feed_cache import FeedCache
+from benchmarks.feed_server import serve
+from benchmarks.fixtures import feed_layout, make_rss
+
+
+def build_feeds(servers, items):
+    """Point every RSS_FEEDS entry at a fixture feed, one stand-in host per original host."""
+    hosts = {}
+    feeds = {}
+    for index, (category, host) in enumerate(feed_layout()):
+        server = servers[hosts.setdefault(host, len(hosts)) % len(servers)]
+        url = server.add_route(f"/feed/{index}.xml", make_rss(host, category, items=items, seed=index))
+        feeds.setdefault(category, []).append(url)
+    return feeds
+
+
+def timed(func, **kwargs):
+    start = time.perf_counter()
+    result = func(**kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2, help="server response delay in seconds")
+    parser.add_argument("--items", type=int, default=10, help="entries per fixture feed")
+    args = parser.parse_args()
+
+    host_count = len({host for _, host in feed_layout()})
+    original_feeds = rss_parser.RSS_FEEDS
+    with serve(count=host_count, latency=args.latency) as servers:
+        rss_parser.RSS_FEEDS = build_feeds(servers, args.items)
+        try:
+            serial_time, serial = timed(rss_parser.fetch_rss_feeds)
+            concurrent_time, concurrent = timed(rss_parser.fetch_rss_feeds, concurrent=True)
+            with tempfile.TemporaryDirectory() as cache_dir:
+                cache = FeedCache(cache_dir)
+                cold_time, _ = timed(rss_parser.fetch_rss_feeds, concurrent=True, cache=cache)
+                warm_time, warm = timed(rss_parser.fetch_rss_feeds, concurrent=True, cache=cache)
+        finally:
+            rss_parser.RSS_FEEDS = original_feeds
+
+    print(json.dumps({
+        "feeds": sum(len(urls) for urls in original_feeds.values()),
+        "hosts": host_count,
+        "latency_s": args.latency,
+        "articles": len(serial),
+        "serial_s": round(serial_time, 3),
+        "concurrent_s": round(concurrent_time, 3),
+        "speedup": round(serial_time / concurrent_time, 2),
+        "cached_cold_s": round(cold_time, 3),
+        "cached_warm_s": round(warm_time, 3),
+        "same_output": serial == concurrent == warm,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
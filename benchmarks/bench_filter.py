@@ -0,0 +1,108 @@
+"""
+Compare `filter_articles_for_user` with its inverted index against the previous
+nested-loop implementation, for every persona at 10k and 100k articles.
+
+Run from the repository root:
+    python -m benchmarks.bench_filter [--sizes 10000 100000]
+"""
+import argparse
+import json
+import time
+
+from article_categorizer import categorize_articles
+from article_filter import ENTERTAINMENT_KEYWORDS, ArticleIndex, filter_articles_for_user
+from benchmarks.fixtures import make_articles
+from user_preferences import USER_PERSONAS
+
+
+def legacy_filter_articles_for_user(categorized_articles, user_data):
+    """The nested-loop filter this benchmark compares against (without the random fallback)."""
+    filtered_articles = []
+    interests = [interest.lower() for interest in user_data["interests"]]
+    sources = [source.lower() for source in user_data["sources"]]
+    has_entertainment_interests = any(interest in ENTERTAINMENT_KEYWORDS for interest in interests)
+
+    for article in categorized_articles:
+        article_categories = [cat.lower() for cat in article.get("categories", [])]
+        article_source = article.get("source", "").lower()
+        article_title = article.get("title", "").lower()
+        article_content = article.get("content", "").lower()
+        relevance_score = 0
+        for category in article_categories:
+            for interest in interests:
+                if interest in category or category in interest:
+                    relevance_score += 3
+                    break
+        for interest in interests:
+            if interest in article_title:
+                relevance_score += 4
+                break
+        if relevance_score == 0:
+            for interest in interests:
+                if interest in article_content:
+                    relevance_score += 1
+                    break
+        for source in sources:
+            if source in article_source or article_source in source:
+                relevance_score += 2
+                break
+        if has_entertainment_interests and relevance_score == 0:
+            for keyword in ENTERTAINMENT_KEYWORDS:
+                if keyword in article_title or keyword in " ".join(article_categories):
+                    relevance_score += 2
+                    break
+                elif keyword in article_content:
+                    relevance_score += 1
+                    break
+        if relevance_score > 0:
+            article["relevance_score"] = relevance_score
+            filtered_articles.append(article)
+    filtered_articles.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+    return filtered_articles[:15]
+
+
+def ranked(articles):
+    return [(article["link"], article["relevance_score"]) for article in articles]
+
+
+def run(size):
+    articles = categorize_articles(make_articles(size, seed=size), batch=True)
+
+    start = time.perf_counter()
+    legacy = {name: ranked(legacy_filter_articles_for_user(articles, user)) for name, user in USER_PERSONAS.items()}
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = ArticleIndex(articles)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = {name: ranked(filter_articles_for_user(articles, user, index=index)) for name, user in USER_PERSONAS.items()}
+    query_time = time.perf_counter() - start
+
+    # A second pass hits the memoized term lookups, as repeated clicks do
+    start = time.perf_counter()
+    for user in USER_PERSONAS.values():
+        filter_articles_for_user(articles, user, index=index)
+    warm_time = time.perf_counter() - start
+
+    users = len(USER_PERSONAS)
+    return {
+        "articles": size,
+        "legacy_ms_per_user": round(1000 * legacy_time / users, 2),
+        "index_build_ms": round(1000 * build_time, 2),
+        "indexed_ms_per_user": round(1000 * query_time / users, 2),
+        "indexed_warm_ms_per_user": round(1000 * warm_time / users, 2),
+        "same_ranking": legacy == indexed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    print(json.dumps([run(size) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
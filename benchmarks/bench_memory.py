@@ -0,0 +1,63 @@
+"""
+Measure memory per 100k loaded articles held as plain dicts versus
+ArticleRecords, including the copies the categorize and summarize stages make.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory [--articles 100000]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from article_categorizer import categorize_articles
+from article_record import ArticleRecord, with_fields
+from benchmarks.fixtures import make_articles
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current - start, peak - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=100000)
+    args = parser.parse_args()
+
+    # Serialized rows, so every loaded article gets its own string objects as
+    # rows loaded from the article store or the feed cache do
+    rows = [json.dumps(dict(article, published=article["published"].isoformat()))
+            for article in categorize_articles(make_articles(args.articles, seed=5), batch=True)]
+    scale = 100000 / args.articles
+
+    def as_dicts():
+        articles = [json.loads(row) for row in rows]
+        # categorize_article and summarize_article each used to copy the dict
+        categorized = [dict(article) for article in articles]
+        return [dict(article, summary="") for article in categorized]
+
+    def as_records():
+        articles = [ArticleRecord(json.loads(row)) for row in rows]
+        return [with_fields(article, summary="") for article in articles]
+
+    results = {"articles": args.articles}
+    for name, build in (("dicts", as_dicts), ("records", as_records)):
+        kept, current, peak = measure(build)
+        results[name] = {
+            "retained_mb_per_100k": round(current * scale / 2**20, 2),
+            "peak_mb_per_100k": round(peak * scale / 2**20, 2),
+        }
+        del kept
+    results["retained_saving"] = round(1 - results["records"]["retained_mb_per_100k"] / results["dicts"]["retained_mb_per_100k"], 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
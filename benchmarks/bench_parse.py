@@ -0,0 +1,179 @@
+"""
+Measure how feed parsing scales with processes: parse_feed_bytes on 1..N cores
+over already downloaded fixture feeds, and `fetch_rss_feeds(concurrent=True)`
+against local stand-in hosts with parsing in the download threads versus in a
+process pool of each size.
+
+Also checks that a refresh whose deadline passes while parses are queued
+records those feeds as "deadline", never as failures; the run exits with
+status 1 otherwise.
+
+Run from the repository root:
+    python -m benchmarks.bench_parse [--feeds 600] [--items 40] [--cores 1,2,4] [--deadline 2]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import rss_parser
+from benchmarks.feed_server import serve
+from benchmarks.fixtures import TOPICS, make_atom, make_rss
+from feed_health import FeedHealth
+
+FEED_HOSTS = 8
+
+
+def make_feeds(count, items):
+    """`count` (path, category, body) fixture feeds with HTML bodies, alternating RSS and Atom."""
+    categories = list(TOPICS)
+    feeds = []
+    for index in range(count):
+        category = categories[index % len(categories)]
+        if index % 2:
+            feeds.append((f"/feed/{index}.atom", category, make_atom(f"Source {index}", category, items, index)))
+        else:
+            feeds.append((f"/feed/{index}.xml", category,
+                          make_rss(f"Source {index}", category, items, index, html=True)))
+    return feeds
+
+
+def default_cores():
+    cpus = os.cpu_count() or 1
+    cores = [1]
+    while cores[-1] * 2 < cpus:
+        cores.append(cores[-1] * 2)
+    if cores[-1] != cpus:
+        cores.append(cpus)
+    return cores
+
+
+def parse_only(feeds, cores):
+    """Wall time of parsing every feed's bytes inline and on pools of each size."""
+    payloads = [(body.encode("utf-8"), {}, f"http://127.0.0.1{path}") for path, _, body in feeds]
+    contents, headers, urls = zip(*payloads)
+
+    start = time.perf_counter()
+    inline = [rss_parser.parse_feed_bytes(*payload) for payload in payloads]
+    results = {"inline_s": round(time.perf_counter() - start, 3)}
+    for workers in cores:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Start the processes before timing, as a long-running refresher would have them
+            list(pool.map(abs, range(workers)))
+            start = time.perf_counter()
+            parsed = list(pool.map(rss_parser.parse_feed_bytes, contents, headers, urls,
+                                   chunksize=max(1, len(payloads) // (workers * 4))))
+            elapsed = time.perf_counter() - start
+        results[f"{workers}_processes_s"] = round(elapsed, 3)
+        results[f"{workers}_processes_speedup"] = round(results["inline_s"] / elapsed, 2)
+        results[f"{workers}_processes_same_output"] = _strip_now(parsed) == _strip_now(inline)
+    return results
+
+
+def _strip_now(parsed):
+    """Parsed feeds without the entries' dates, which fall back to the current time when missing."""
+    return [(source, ids, [row[:3] + row[4:] for row in rows], errors) for source, ids, rows, errors in parsed]
+
+
+def fetch(feeds, cores, workers):
+    """Wall time of fetching every feed from the stand-ins, parsing in threads and on pools of each size."""
+    original_feeds = rss_parser.RSS_FEEDS
+    results = {}
+    with serve(count=FEED_HOSTS) as servers:
+        urls = {}
+        for index, (path, category, body) in enumerate(feeds):
+            urls.setdefault(category, []).append(servers[index % len(servers)].add_route(path, body))
+        rss_parser.RSS_FEEDS = urls
+        try:
+            def run(parse_workers):
+                start = time.perf_counter()
+                articles = rss_parser.fetch_rss_feeds(concurrent=True, max_workers=workers, per_host_limit=workers,
+                                                      per_host_delay=0, parse_workers=parse_workers)
+                return time.perf_counter() - start, articles
+
+            threads_time, threaded = run(None)
+            results["threads_s"] = round(threads_time, 3)
+            results["articles"] = len(threaded)
+            for parse_workers in cores:
+                elapsed, articles = run(parse_workers)
+                results[f"{parse_workers}_processes_s"] = round(elapsed, 3)
+                results[f"{parse_workers}_processes_speedup"] = round(threads_time / elapsed, 2)
+                results[f"{parse_workers}_processes_same_output"] = articles == threaded
+        finally:
+            rss_parser.RSS_FEEDS = original_feeds
+    return results
+
+
+def deadline_check(feeds, deadline, workers):
+    """
+    Fetch every feed with one parse process and a deadline too short for all of them.
+
+    Returns:
+        Outcome counts passed to _record_outcome and the failures the feed health
+        recorded, once the feeds still running at the deadline have finished
+    """
+    original = rss_parser.RSS_FEEDS, rss_parser._record_outcome, rss_parser.TIMEOUT
+    original_record = original[1]
+    outcomes = Counter()
+
+    def record_outcome(health, feed_url, started, result, error=None):
+        outcomes[result] += 1
+        return original_record(health, feed_url, started, result, error)
+
+    with tempfile.TemporaryDirectory() as tmp, serve(count=FEED_HOSTS) as servers:
+        urls = {}
+        for index, (path, category, body) in enumerate(feeds):
+            urls.setdefault(category, []).append(servers[index % len(servers)].add_route(path, body))
+        rss_parser.RSS_FEEDS = urls
+        rss_parser._record_outcome = record_outcome
+        # Requests get their full timeout rather than the time left, as in a refresh with a long deadline
+        rss_parser.TIMEOUT = deadline / 4
+        health = FeedHealth(os.path.join(tmp, "feed_health.json"))
+        try:
+            rss_parser.fetch_rss_feeds(concurrent=True, max_workers=workers, per_host_limit=workers,
+                                       per_host_delay=0, health=health, deadline=deadline, parse_workers=1)
+            # The refresh does not wait for feeds still running; they record their outcome when done
+            give_up = time.monotonic() + 30
+            while time.monotonic() < give_up and any(thread.name.startswith("ThreadPoolExecutor")
+                                                     for thread in threading.enumerate()):
+                time.sleep(0.1)
+        finally:
+            rss_parser.RSS_FEEDS, rss_parser._record_outcome, rss_parser.TIMEOUT = original
+        failures = sum(entry["failures"] for entry in health.report().values())
+    return {"deadline_s": deadline, "outcomes": dict(outcomes), "health_failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--feeds", type=int, default=600)
+    parser.add_argument("--items", type=int, default=40, help="entries per feed (parse_feed keeps 10)")
+    parser.add_argument("--cores", help="comma-separated process counts (default: 1, 2, 4... up to the CPUs)")
+    parser.add_argument("--workers", type=int, default=16, help="download threads in the fetch measurement")
+    parser.add_argument("--deadline", type=float, default=2.0, help="refresh deadline of the deadline check")
+    args = parser.parse_args()
+
+    cores = [int(n) for n in args.cores.split(",")] if args.cores else default_cores()
+    feeds = make_feeds(args.feeds, args.items)
+    deadline = deadline_check(feeds, args.deadline, args.workers)
+    print(json.dumps({
+        "cpus": os.cpu_count(),
+        "feeds": args.feeds,
+        "items_per_feed": args.items,
+        "feed_mb": round(sum(len(body) for _, _, body in feeds) / 2**20, 1),
+        "parse_only": parse_only(feeds, cores),
+        "fetch": fetch(feeds, cores, args.workers),
+        "deadline_check": deadline,
+    }, indent=2))
+
+    if deadline["outcomes"].get("error") or deadline["health_failures"]:
+        print("FAILED: parses cut off by the refresh deadline were recorded as feed failures", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
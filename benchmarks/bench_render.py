@@ -0,0 +1,115 @@
+"""
+Render many newsletters in every format and compare with the previous
+string-concatenation Markdown generator, and time repeated newsletter requests
+through the pipeline with and without the render cache.
+
+Run from the repository root:
+    python -m benchmarks.bench_render [--newsletters 10000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from article_categorizer import categorize_articles
+from benchmarks.fixtures import make_articles
+from newsletter_generator import (
+    build_newsletter, format_date, generate_newsletter, get_category_emoji, group_by_category, newsletter_info,
+    section_articles
+)
+from newsletter_renderer import RENDERERS, render_newsletter
+from pipeline import assemble_newsletter, stream_newsletter
+from render_cache import RenderCache, newsletter_key
+from user_preferences import USER_PERSONAS
+
+
+def legacy_generate_newsletter(articles, user_data):
+    """The `newsletter +=` Markdown generator this benchmark compares against."""
+    newsletter = f"# {user_data['name']}'s Personalized Newsletter\n### {format_date(articles[0]['published'])}\n\n---\n\n"
+    interests_text = ', '.join(user_data['interests'][:3])
+    newsletter += f"## Today's Highlights\nWelcome to your personalized newsletter, {user_data['name']}. Here are today's top stories curated just for you based on your interests in {interests_text}, and more.\n\n---\n\n"
+    category_articles = {}
+    for article in articles:
+        category_articles.setdefault(article["categories"][0] if article["categories"] else "General", []).append(article)
+    for category, cat_articles in sorted(category_articles.items(), key=lambda x: len(x[1]), reverse=True):
+        newsletter += f"## {get_category_emoji(category)} {category}\n\n"
+        for i, article in enumerate(cat_articles[:4]):
+            newsletter += f"### [{article['title']}]({article['link']})\n"
+            newsletter += f"*{article['source']} - {format_date(article['published'])}*\n\n"
+            newsletter += f"{article['summary']}\n\n"
+            if i < len(cat_articles[:4]) - 1:
+                newsletter += "---\n\n"
+        newsletter += "\n\n"
+    newsletter += f"## Thanks for Reading!\nThis newsletter was generated specifically for {user_data['name']} based on personal interests including {interests_text}.\n\nCheck back tomorrow for more personalized news.\n"
+    return newsletter
+
+
+def timed(func, count):
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    elapsed = time.perf_counter() - start
+    return {"total_s": round(elapsed, 3), "newsletters_per_s": round(count / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--newsletters", type=int, default=10000)
+    args = parser.parse_args()
+
+    pool = categorize_articles(make_articles(600, seed=11), batch=True)
+    for article in pool:
+        article["summary"] = article["content"][:400]
+    # Each newsletter gets 15 articles, as filter_articles_for_user returns
+    batches = [pool[i % 40 * 15:i % 40 * 15 + 15] for i in range(40)]
+    users = list(USER_PERSONAS.values())
+
+    def user_articles(i):
+        return batches[i % len(batches)], users[i % len(users)]
+
+    results = {"newsletters": args.newsletters}
+    results["legacy_markdown"] = timed(lambda i: legacy_generate_newsletter(*user_articles(i)), args.newsletters)
+    for fmt in RENDERERS:
+        results[fmt] = timed(lambda i: generate_newsletter(*user_articles(i), fmt=fmt), args.newsletters)
+
+    # Build once, render every format, and stream straight to a file
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "out.txt"), "w", encoding="utf-8") as out:
+            def all_formats_to_file(i):
+                newsletter = build_newsletter(*user_articles(i))
+                for fmt in RENDERERS:
+                    render_newsletter(newsletter, fmt, out)
+            results["all_formats_streamed_to_file"] = timed(all_formats_to_file, args.newsletters)
+
+    # Repeated requests through the pipeline: summarize (locally, no network) and render every format,
+    # without a render cache and with one that already holds the newsletters
+    def request(i, cache=None):
+        articles, user = user_articles(i)
+        # Long enough feed content for every article to be summarized locally
+        articles = [dict({key: value for key, value in article.items() if key != "summary"},
+                         content=" ".join([article["content"]] * 3)) for article in articles]
+        sections = [(category, section_articles(cat_articles)) for category, cat_articles in group_by_category(articles)]
+        keys = {fmt: newsletter_key(user, sections, newsletter_info(user), fmt) for fmt in RENDERERS}
+        if cache is not None and all(cache.get(key) is not None for key in keys.values()):
+            return
+        parts = list(stream_newsletter(articles, user, workers=None, sections=sections, render_cache=cache))
+        for fmt, key in keys.items():
+            text = assemble_newsletter(parts, fmt)
+            if cache is not None:
+                cache.put(key, text)
+    requests = min(args.newsletters, 2000)
+    results["pipeline_request"] = timed(request, requests)
+    cache = RenderCache()
+    for i in range(len(batches) * len(users)):
+        request(i, cache)
+    warm = cache.stats()
+    results["pipeline_request_render_cache"] = timed(lambda i: request(i, cache), requests)
+    hits, misses = cache.stats()["hits"] - warm["hits"], cache.stats()["misses"] - warm["misses"]
+    results["pipeline_request_render_cache"]["hit_rate"] = round(hits / (hits + misses), 3)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
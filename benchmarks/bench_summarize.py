@@ -0,0 +1,92 @@
+"""
+Compare serial and parallel `summarize_articles` against a local stand-in article host,
+and the local summary mode, which only downloads pages whose feed content is too thin.
+Also time a request where every third article host is slow, with and without a
+time budget.
+
+Run from the repository root:
+    python -m benchmarks.bench_summarize [--articles 15] [--latency 0.3] [--slow-latency 5] [--budget 1]
+"""
+import argparse
+import json
+import time
+
+from article_summarizer import SUMMARY_WORKERS, download_savings, summarize_articles
+from benchmarks.feed_server import serve
+from benchmarks.fixtures import make_article_page, make_articles
+from instrumentation import METRICS
+
+
+def host_articles(server, count, slow_server=None):
+    """Serve a page for each generated article and point its link at the stand-in (every third at `slow_server`)."""
+    articles = make_articles(count, seed=7)
+    for index, article in enumerate(articles):
+        page = make_article_page(article["title"], article["content"] * 3)
+        host = slow_server if slow_server is not None and index % 3 == 2 else server
+        article["link"] = host.add_route(f"/article/{index}", page, "text/html")
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.3, help="server response delay in seconds")
+    parser.add_argument("--workers", type=int, default=SUMMARY_WORKERS)
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="response delay of the slow hosts")
+    parser.add_argument("--budget", type=float, default=1.0, help="time budget of the slow-host request")
+    args = parser.parse_args()
+
+    with serve(latency=args.latency) as [server], serve(latency=args.slow_latency) as [slow_server]:
+        articles = host_articles(server, args.articles)
+
+        start = time.perf_counter()
+        serial = summarize_articles(articles, mode="download")
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = summarize_articles(articles, workers=args.workers, mode="download")
+        parallel_time = time.perf_counter() - start
+
+        METRICS.reset()
+        start = time.perf_counter()
+        summarize_articles(articles, workers=args.workers, mode="local")
+        local_time = time.perf_counter() - start
+        savings = download_savings(METRICS.snapshot())
+
+        mixed = host_articles(server, args.articles, slow_server)
+        start = time.perf_counter()
+        summarize_articles(mixed, workers=args.workers, mode="download")
+        unbudgeted_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        budgeted = summarize_articles(mixed, workers=args.workers, mode="download", time_budget=args.budget)
+        budgeted_time = time.perf_counter() - start
+        degraded = [index for index, article in enumerate(budgeted) if article.get("summary_degraded")]
+
+    print(json.dumps({
+        "articles": len(articles),
+        "latency_s": args.latency,
+        "workers": args.workers,
+        "serial_s": round(serial_time, 3),
+        "parallel_s": round(parallel_time, 3),
+        "speedup": round(serial_time / parallel_time, 2),
+        "same_summaries": [a["summary"] for a in serial] == [a["summary"] for a in parallel],
+        "local_s": round(local_time, 3),
+        "local_speedup": round(parallel_time / local_time, 2),
+        "downloads_avoided": savings["avoided"],
+        "download_avoidance_rate": round(savings["avoidance_rate"], 3),
+        "estimated_latency_saved_s": round(savings["seconds_saved"] or 0, 3),
+        "slow_hosts": {
+            "slow_latency_s": args.slow_latency,
+            "slow_articles": sum(1 for index in range(len(mixed)) if index % 3 == 2),
+            "no_budget_s": round(unbudgeted_time, 3),
+            "budget_s": args.budget,
+            "with_budget_s": round(budgeted_time, 3),
+            "degraded": len(degraded),
+            "only_slow_degraded": all(index % 3 == 2 for index in degraded),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
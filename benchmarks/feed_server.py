@@ -0,0 +1,86 @@
+"""Local HTTP stand-in for feed and article hosts used by the benchmarks."""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Serve fixed responses from the server's route table."""
+
+    def _respond(self, send_body):
+        route = self.server.routes.get(self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if route is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body, content_type, etag = route
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering from a {path: (body, content_type, etag)} table."""
+
+    daemon_threads = True
+
+    def __init__(self, routes=None, latency=0.0):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.routes = {}
+        self.latency = latency
+        for path, (body, content_type) in (routes or {}).items():
+            self.add_route(path, body, content_type)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def add_route(self, path, body, content_type="application/rss+xml"):
+        """Register a response and return its absolute URL."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.routes[path] = (body, content_type, etag)
+        return self.base_url + path
+
+
+@contextmanager
+def serve(count=1, latency=0.0):
+    """
+    Run `count` stand-in servers, each on its own port (and so its own host).
+
+    Yields:
+        List of running StandInServer instances
+    """
+    servers = [StandInServer(latency=latency) for _ in range(count)]
+    threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in servers]
+    for thread in threads:
+        thread.start()
+    try:
+        yield servers
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
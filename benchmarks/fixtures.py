@@ -0,0 +1,136 @@
+"""Deterministic synthetic RSS feeds, article pages and article dicts for benchmarks."""
+import random
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from rss_parser import RSS_FEEDS
+
+WORDS = (
+    "the a market team film study government player company launch research space "
+    "music album season election software startup court health vaccine climate "
+    "energy stock economy league coach director series festival ai data digital "
+    "report analysts said officials new year week record growth policy"
+).split()
+
+TOPICS = {
+    "General News": ["government", "election", "minister", "policy", "court"],
+    "Technology": ["software", "ai", "startup", "smartphone", "blockchain"],
+    "Finance": ["market", "stock", "economy", "investment", "revenue"],
+    "Sports": ["football", "league", "coach", "tournament", "race"],
+    "Entertainment": ["movie", "album", "celebrity", "festival", "netflix"],
+    "Science": ["research", "space", "nasa", "climate", "physics"],
+}
+
+BASE_DATE = datetime(2024, 1, 15, 12, 0, 0)
+
+
+def make_sentence(rng, topic_words, length=14):
+    words = [rng.choice(topic_words if rng.random() < 0.3 else WORDS) for _ in range(length)]
+    return " ".join(words).capitalize() + "."
+
+
+def make_body(rng, topic_words, sentences=8):
+    return " ".join(make_sentence(rng, topic_words) for _ in range(sentences))
+
+
+def make_html_body(rng, topic_words, paragraphs=4):
+    """An HTML body in the style of a WordPress content:encoded block."""
+    parts = ['<figure><img src="https://example.com/a.jpg" alt="" /></figure>']
+    for _ in range(paragraphs):
+        parts.append(f"<p>{make_body(rng, topic_words, 3)} &amp; more &#8217;quoted&#8217;.</p>")
+    parts.append("<script>var tracking = {id: 1};</script>")
+    parts.append('<p>The post <a href="https://example.com">appeared first</a> on Example.</p>')
+    return "\n".join(parts)
+
+
+def make_rss(title, category, items=10, seed=0, link_base="https://example.com", html=False):
+    """Build an RSS 2.0 document with `items` entries."""
+    rng = random.Random(seed)
+    topic_words = TOPICS.get(category, WORDS)
+    entries = []
+    for i in range(items):
+        published = BASE_DATE - timedelta(minutes=rng.randint(0, 60 * 24 * 3))
+        body = make_html_body(rng, topic_words) if html else make_body(rng, topic_words)
+        entries.append(
+            "<item>"
+            f"<title>{escape(make_sentence(rng, topic_words, 8)[:-1])}</title>"
+            f"<link>{link_base}/{seed}/{i}</link>"
+            f"<guid>{link_base}/{seed}/{i}</guid>"
+            f"<pubDate>{format_datetime(published)}</pubDate>"
+            f"<description>{escape(body)}</description>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        f"<title>{escape(title)}</title><link>{link_base}</link>"
+        f"<description>{escape(title)} feed</description>"
+        + "".join(entries)
+        + "</channel></rss>"
+    )
+
+
+def make_atom(title, category, items=10, seed=0, link_base="https://example.com"):
+    """Build an Atom 1.0 document with `items` entries carrying HTML content."""
+    rng = random.Random(seed)
+    topic_words = TOPICS.get(category, WORDS)
+    entries = []
+    for i in range(items):
+        updated = BASE_DATE - timedelta(minutes=rng.randint(0, 60 * 24 * 3))
+        entries.append(
+            "<entry>"
+            f"<title>{escape(make_sentence(rng, topic_words, 8)[:-1])}</title>"
+            f'<link href="{link_base}/{seed}/{i}"/>'
+            f"<id>{link_base}/{seed}/{i}</id>"
+            f"<updated>{updated.isoformat()}Z</updated>"
+            f'<content type="html">{escape(make_html_body(rng, topic_words))}</content>'
+            "</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>{escape(title)}</title><id>{link_base}</id>"
+        f"<updated>{BASE_DATE.isoformat()}Z</updated>"
+        + "".join(entries)
+        + "</feed>"
+    )
+
+
+def make_article_page(title, body):
+    """A minimal article page that newspaper3k can parse."""
+    paragraphs = "".join(f"<p>{escape(s.strip())}.</p>" for s in body.split(".") if s.strip())
+    return (
+        f"<html><head><title>{escape(title)}</title></head>"
+        f"<body><article><h1>{escape(title)}</h1>{paragraphs}</article></body></html>"
+    )
+
+
+def feed_layout():
+    """(category, original host) for every feed in RSS_FEEDS, in RSS_FEEDS order."""
+    layout = []
+    for category, feed_urls in RSS_FEEDS.items():
+        for feed_url in feed_urls:
+            layout.append((category, feed_url.split("/")[2]))
+    return layout
+
+
+def make_articles(count, seed=0):
+    """Generate `count` categorized-shape article dicts without going through the network."""
+    rng = random.Random(seed)
+    sources = ["BBC News", "TechCrunch", "WIRED", "ESPN", "Variety", "NASA", "CNBC", "Billboard"]
+    categories = list(TOPICS)
+    articles = []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        topic_words = TOPICS[category]
+        articles.append({
+            "title": make_sentence(rng, topic_words, 8)[:-1],
+            "link": f"https://example.com/article/{i}",
+            "published": BASE_DATE - timedelta(minutes=rng.randint(0, 60 * 24 * 7)),
+            "content": make_body(rng, topic_words, rng.randint(2, 8)),
+            "source": rng.choice(sources),
+            "feed_category": category,
+            "categories": [],
+        })
+    return articles
@@ -0,0 +1,196 @@
+"""
+Load test of concurrent app sessions against local stand-in feed and article servers.
+
+Runs what the app does per Generate click in N threads at once, the way
+Streamlit runs every session's script in its own thread: get the shared
+article snapshot from one ArticleRefresher, filter it for the session's
+persona, summarize through the shared article store and summary cache, and
+render the newsletter. Reports request latency percentiles, throughput and
+memory as JSON:
+    python -m benchmarks.load_test [--sessions 16] [--requests 5] [--articles 2000]
+
+Every persona is first generated alone on a private copy of the articles.
+The run fails (exit status 1) if any concurrent session's selection, relevance
+scores or newsletter differ from that reference, or if the shared snapshot
+was modified, i.e. if one session's work leaked into another's results.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import rss_parser
+from article_filter import ArticleIndex
+from article_store import ArticleStore
+from article_summarizer import SUMMARY_WORKERS
+from benchmarks.feed_server import serve
+from benchmarks.fixtures import make_article_page
+from benchmarks.run_suite import FEED_HOSTS, build_feeds, percentiles
+from category_cache import CategoryCache
+from feed_cache import FeedCache
+from pipeline import assemble_newsletter, refresh_articles, select_sections, stream_newsletter
+from refresher import ArticleRefresher
+from summary_cache import SummaryCache
+from user_preferences import USER_PERSONAS
+
+
+def snapshot_state(articles):
+    """The per-user fields of the shared articles, which sessions must never write."""
+    return [(article.get("relevance_score"), article.get("summary")) for article in articles]
+
+
+def generate(articles, index, user_data, store=None, cache=None, workers=None):
+    """
+    One Generate click: filter, summarize and render the newsletter.
+
+    Returns:
+        (selection, markdown): the (category, [(link, relevance score)]) pairs
+        the newsletter shows, read after rendering, and the rendered Markdown
+    """
+    sections = select_sections(articles, user_data, index=index)
+    parts = list(stream_newsletter(articles, user_data, index=index, store=store, cache=cache, workers=workers,
+                                   sections=sections))
+    selection = [(category, [(article["link"], article.get("relevance_score")) for article in shown])
+                 for category, shown in sections]
+    return selection, assemble_newsletter(parts)
+
+
+def run_sessions(refresher, personas, sessions, requests, store, cache, workers):
+    """
+    Run `sessions` concurrent sessions of `requests` Generate clicks each.
+
+    Session i starts with persona i and moves to the next persona on every click.
+
+    Returns:
+        (per-request latencies, wall time, [(session, persona name, result)], errors)
+    """
+    latencies = []
+    results = []
+    errors = []
+    lock = threading.Lock()
+    start_line = threading.Barrier(sessions + 1)
+
+    def session(number):
+        start_line.wait()
+        for request in range(requests):
+            user_data = personas[(number + request) % len(personas)]
+            start = time.perf_counter()
+            try:
+                current = refresher.snapshot()
+                result = generate(current.articles, current.index, user_data, store, cache, workers)
+            except Exception as e:
+                with lock:
+                    errors.append(f"session {number}: {e!r}")
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                results.append((number, user_data["name"], result))
+
+    threads = [threading.Thread(target=session, args=(number,)) for number in range(sessions)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start, results, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent sessions")
+    parser.add_argument("--requests", type=int, default=5, help="Generate clicks per session")
+    parser.add_argument("--articles", type=int, default=2000, help="articles served by the stand-in feeds")
+    parser.add_argument("--latency", type=float, default=0.0, help="server response delay in seconds")
+    parser.add_argument("--workers", type=int, default=SUMMARY_WORKERS, help="summary downloads per session")
+    parser.add_argument("--no-memory", action="store_true", help="do not trace memory")
+    parser.add_argument("--out", help="also write the JSON to this file")
+    args = parser.parse_args()
+
+    personas = list(USER_PERSONAS.values())
+    original_feeds = rss_parser.RSS_FEEDS
+    with tempfile.TemporaryDirectory() as tmp, serve(count=FEED_HOSTS + 1, latency=args.latency) as servers:
+        article_server, feed_servers = servers[0], servers[1:]
+        rss_parser.RSS_FEEDS = build_feeds(feed_servers, article_server, args.articles)
+        store = ArticleStore(os.path.join(tmp, "articles.db"))
+        cache = SummaryCache(os.path.join(tmp, "summaries.db"))
+        feed_cache = FeedCache(os.path.join(tmp, "feeds"))
+        category_cache = CategoryCache(os.path.join(tmp, "categories.db"))
+        # Shared by every session, as the app's cached resources are; not started, so the
+        # snapshot is not swapped during the run
+        refresher = ArticleRefresher(lambda: refresh_articles(store, feed_cache, category_cache=category_cache))
+        try:
+            start = time.perf_counter()
+            current = refresher.snapshot()
+            load_s = time.perf_counter() - start
+        finally:
+            rss_parser.RSS_FEEDS = original_feeds
+        for article in current.articles:
+            page = make_article_page(article["title"], article["content"])
+            article_server.add_route(article["link"][len(article_server.base_url):], page, "text/html")
+
+        # Each persona alone, on its own copy of the articles and without the shared caches
+        reference = {}
+        for user_data in personas:
+            private = copy.deepcopy(current.articles)
+            reference[user_data["name"]] = generate(private, ArticleIndex(private), user_data,
+                                                    workers=args.workers)
+        before = snapshot_state(current.articles)
+
+        if not args.no_memory:
+            tracemalloc.start()
+        latencies, wall_s, results, errors = run_sessions(refresher, personas, args.sessions, args.requests,
+                                                          store, cache, args.workers)
+        peak = tracemalloc.get_traced_memory()[1] if not args.no_memory else None
+        if not args.no_memory:
+            tracemalloc.stop()
+        snapshot_modified = snapshot_state(current.articles) != before
+        cache_stats = cache.stats()
+
+    leaks = [{"session": number, "persona": name,
+              "selection_differs": result[0] != reference[name][0],
+              "newsletter_differs": result[1] != reference[name][1]}
+             for number, name, result in results if result != reference[name]]
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sessions": args.sessions,
+        "requests_per_session": args.requests,
+        "articles": len(current.articles),
+        "latency_s": args.latency,
+        "workers": args.workers,
+        "initial_load_s": round(load_s, 3),
+        "requests": len(latencies),
+        "total_s": round(wall_s, 3),
+        "throughput_per_s": round(len(latencies) / wall_s, 2) if wall_s else None,
+        "latency_ms": percentiles(latencies),
+        "peak_traced_mb": round(peak / 2**20, 2) if peak is not None else None,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "summary_cache_hit_rate": round(cache_stats["hit_rate"], 3),
+        "errors": errors,
+        "snapshot_modified": snapshot_modified,
+        "leaks": leaks,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if errors or leaks or snapshot_modified:
+        print(f"FAILED: {len(errors)} errors, {len(leaks)} of {len(results)} results differ from the isolated "
+              f"run, shared snapshot {'modified' if snapshot_modified else 'intact'}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Offline end-to-end benchmark suite.
+
+Serves fixture RSS/Atom feeds and article pages from local stand-in servers and
+drives every stage the app runs: fetch_rss_feeds, deduplicate_articles,
+categorize_articles, filter_articles_for_user, the summarizer and
+generate_newsletter. For each
+corpus size it reports per stage the units processed, wall time, throughput,
+latency percentiles per unit and peak traced memory, together with cold
+import times of the pipeline modules and CLI start-up times, as JSON:
+    python -m benchmarks.run_suite [--sizes 100,10000,100000] [--out results.json]
+
+Compare two result files stage by stage:
+    python -m benchmarks.run_suite --compare old.json new.json
+
+Throughput and memory are measured with tracemalloc running unless
+--no-memory is given; keep the flag the same across runs that are compared.
+Memory allocated in the summarizer's NLP processes is not traced.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import rss_parser
+from article_categorizer import categorize_articles
+from article_deduplicator import deduplicate_articles
+from article_filter import ArticleIndex, filter_articles_for_user
+from article_summarizer import SUMMARY_WORKERS, iter_summaries
+from benchmarks.feed_server import serve
+from benchmarks.fixtures import TOPICS, make_article_page, make_atom, make_rss
+from newsletter_generator import generate_newsletter
+from newsletter_renderer import RENDERERS
+from user_preferences import USER_PERSONAS
+
+SUITE_VERSION = 1
+DEFAULT_SIZES = (100, 10000, 100000)
+# parse_feed keeps at most this many entries per feed
+ITEMS_PER_FEED = 10
+FEED_HOSTS = 8
+SOURCES = 40
+CATEGORIZE_CHUNK = 1000
+# Modules whose cold import time is reported, and CLI commands whose start-up is timed
+STARTUP_MODULES = ("rss_parser", "article_categorizer", "article_filter", "article_summarizer",
+                   "newsletter_generator", "pipeline", "batch_generator", "newsletter")
+STARTUP_COMMANDS = (("newsletter", "users"), ("newsletter", "--help"))
+STARTUP_REPEAT = 3
+
+
+def percentiles(seconds):
+    """Latency summary in milliseconds."""
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)] * 1000, 3)
+
+    return {"p50": at(0.50), "p90": at(0.90), "p95": at(0.95), "p99": at(0.99), "max": at(1.0)}
+
+
+class Stage:
+    """Collects the wall time, per-unit latencies and peak memory of one stage."""
+
+    def __init__(self, name, unit, trace_memory, latency_of=None):
+        self.name = name
+        self.unit = unit
+        self.latency_of = latency_of or unit
+        self.trace_memory = trace_memory
+        self.latencies = []
+        self.units = 0
+        self.extra = {}
+
+    @contextmanager
+    def timed_unit(self, units=1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.units += units
+
+    @contextmanager
+    def run(self):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield self
+        self.total = time.perf_counter() - start
+        self.peak = tracemalloc.get_traced_memory()[1] - base if self.trace_memory else None
+
+    def result(self):
+        result = {
+            "unit": self.unit,
+            "units": self.units,
+            "total_s": round(self.total, 3),
+            "throughput_per_s": round(self.units / self.total, 1) if self.total else None,
+            "latency_of": self.latency_of,
+            "latency_ms": percentiles(self.latencies),
+            "peak_mb": round(self.peak / 2**20, 2) if self.peak is not None else None,
+        }
+        result.update(self.extra)
+        return result
+
+
+def measure_startup(repeat=STARTUP_REPEAT):
+    """Best-of-`repeat` cold import time per module and wall time per CLI command, in fresh interpreters."""
+    imports = {}
+    for module in STARTUP_MODULES:
+        code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+        times = [float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                      check=True).stdout.split()[-1])
+                 for _ in range(repeat)]
+        imports[module] = round(min(times) * 1000, 1)
+    commands = {}
+    for command in STARTUP_COMMANDS:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-m", *command], capture_output=True, check=True)
+            times.append(time.perf_counter() - start)
+        commands[" ".join(command)] = round(min(times) * 1000, 1)
+    return {"import_ms": imports, "command_ms": commands}
+
+
+def build_feeds(servers, article_server, articles):
+    """Serve enough fixture feeds for `articles` entries, alternating RSS and Atom."""
+    categories = list(TOPICS)
+    link_base = article_server.base_url + "/article"
+    feeds = {}
+    for index in range(math.ceil(articles / ITEMS_PER_FEED)):
+        category = categories[index % len(categories)]
+        items = min(ITEMS_PER_FEED, articles - index * ITEMS_PER_FEED)
+        title = f"Source {index % SOURCES}"
+        if index % 2:
+            path, body = f"/feed/{index}.atom", make_atom(title, category, items, index, link_base)
+        else:
+            path, body = f"/feed/{index}.xml", make_rss(title, category, items, index, link_base, html=True)
+        url = servers[index % len(servers)].add_route(path, body)
+        feeds.setdefault(category, []).append(url)
+    return feeds
+
+
+def make_users(count):
+    """`count` users cycling through the personas, with distinct names."""
+    personas = list(USER_PERSONAS.values())
+    return [dict(personas[i % len(personas)], name=f"User {i}") for i in range(count)]
+
+
+def run_size(size, users, latency, trace_memory, workers):
+    """Run every stage on a corpus of `size` articles and return the stage results."""
+    stages = {}
+    original_feeds, original_parse_feed = rss_parser.RSS_FEEDS, rss_parser.parse_feed
+    with serve(count=FEED_HOSTS + 1, latency=latency) as servers:
+        article_server, feed_servers = servers[0], servers[1:]
+        rss_parser.RSS_FEEDS = build_feeds(feed_servers, article_server, size)
+
+        fetch = Stage("fetch", "feed", trace_memory)
+
+        def timed_parse_feed(*args, **kwargs):
+            with fetch.timed_unit():
+                return original_parse_feed(*args, **kwargs)
+
+        rss_parser.parse_feed = timed_parse_feed
+        try:
+            with fetch.run():
+                articles = rss_parser.fetch_rss_feeds(concurrent=True, max_workers=workers,
+                                                      per_host_limit=workers, per_host_delay=0)
+        finally:
+            rss_parser.RSS_FEEDS, rss_parser.parse_feed = original_feeds, original_parse_feed
+        fetch.extra["articles"] = len(articles)
+        stages["fetch"] = fetch
+
+        dedupe = Stage("dedupe", "article", trace_memory, "whole corpus")
+        with dedupe.run():
+            with dedupe.timed_unit(len(articles)):
+                articles = deduplicate_articles(articles)
+        dedupe.extra["representatives"] = len(articles)
+        stages["dedupe"] = dedupe
+
+        categorize = Stage("categorize", "article", trace_memory, f"batch of up to {CATEGORIZE_CHUNK} articles")
+        with categorize.run():
+            categorized = []
+            for start in range(0, len(articles), CATEGORIZE_CHUNK):
+                chunk = articles[start:start + CATEGORIZE_CHUNK]
+                with categorize.timed_unit(len(chunk)):
+                    categorized.extend(categorize_articles(chunk, batch=True))
+        stages["categorize"] = categorize
+        del articles
+
+        filtering = Stage("filter", "user", trace_memory)
+        with filtering.run():
+            start = time.perf_counter()
+            index = ArticleIndex(categorized)
+            filtering.extra["index_s"] = round(time.perf_counter() - start, 3)
+            selections = []
+            for user in make_users(users):
+                with filtering.timed_unit():
+                    selections.append((user, filter_articles_for_user(categorized, user, index=index)))
+        stages["filter"] = filtering
+
+        # Only the selected articles are summarized, as in the app; serve their pages
+        selected = {}
+        for _, filtered in selections:
+            for article in filtered:
+                selected.setdefault(article["link"], article)
+        for link, article in selected.items():
+            page = make_article_page(article["title"], article["content"])
+            article_server.add_route(link[len(article_server.base_url):], page, "text/html")
+
+        summarize = Stage("summarize", "article", trace_memory, "time until each summary is ready")
+        with summarize.run():
+            start = time.perf_counter()
+            summarized = {}
+            for _, article in iter_summaries(list(selected.values()), workers=workers):
+                summarized[article["link"]] = article
+                summarize.latencies.append(time.perf_counter() - start)
+                summarize.units += 1
+        stages["summarize"] = summarize
+
+    generate = Stage("generate", "newsletter", trace_memory)
+    with generate.run():
+        size_bytes = 0
+        for user, filtered in selections:
+            newsletter_articles = [summarized[article["link"]] for article in filtered]
+            if not newsletter_articles:
+                continue
+            for fmt in RENDERERS:
+                with generate.timed_unit():
+                    size_bytes += len(generate_newsletter(newsletter_articles, user, fmt=fmt))
+    generate.extra["formats"] = list(RENDERERS)
+    generate.extra["output_kb"] = round(size_bytes / 1024, 1)
+    stages["generate"] = generate
+
+    return {name: stage.result() for name, stage in stages.items()}
+
+
+def compare(old_path, new_path):
+    """Per-stage throughput and p95 latency ratios between two result files."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    report = {}
+    for kind in ("import_ms", "command_ms"):
+        for name, value in new.get("startup", {}).get(kind, {}).items():
+            before = old.get("startup", {}).get(kind, {}).get(name)
+            if before:
+                report.setdefault("startup", {})[f"{kind[:-3]} {name}"] = {"time_ratio": round(value / before, 3)}
+    for size, stages in new["sizes"].items():
+        if size not in old["sizes"]:
+            continue
+        for name, stage in stages.items():
+            before = old["sizes"][size].get(name)
+            if not before:
+                continue
+            entry = {}
+            if before.get("throughput_per_s") and stage.get("throughput_per_s"):
+                entry["throughput_ratio"] = round(stage["throughput_per_s"] / before["throughput_per_s"], 3)
+            if before.get("latency_ms", {}).get("p95") and stage.get("latency_ms", {}).get("p95"):
+                entry["p95_ratio"] = round(stage["latency_ms"]["p95"] / before["latency_ms"]["p95"], 3)
+            if before.get("peak_mb") and stage.get("peak_mb"):
+                entry["peak_mb_ratio"] = round(stage["peak_mb"] / before["peak_mb"], 3)
+            report.setdefault(size, {})[name] = entry
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated corpus sizes")
+    parser.add_argument("--users", type=int, default=25, help="users filtered and generated per size")
+    parser.add_argument("--latency", type=float, default=0.0, help="server response delay in seconds")
+    parser.add_argument("--workers", type=int, default=SUMMARY_WORKERS, help="fetch and summarize workers")
+    parser.add_argument("--no-memory", action="store_true", help="do not trace memory")
+    parser.add_argument("--out", help="also write the JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), indent=2))
+        return
+
+    trace_memory = not args.no_memory
+    results = {
+        "suite_version": SUITE_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "latency_s": args.latency,
+        "workers": args.workers,
+        "users": args.users,
+        "memory_traced": trace_memory,
+        "startup": measure_startup(),
+        "sizes": {},
+    }
+    if trace_memory:
+        tracemalloc.start()
+    for size in (int(size) for size in args.sizes.split(",")):
+        print(f"Running {size} articles...", file=sys.stderr)
+        results["sizes"][str(size)] = run_size(size, args.users, args.latency, trace_memory, args.workers)
+    if trace_memory:
+        tracemalloc.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from article_categorizer import MATCHER, PUNCTUATION_TABLE, preprocess_text, rank_categories
+from instrumentation import METRICS, count
+
+# Default location and size of the category cache
+CATEGORY_CACHE_PATH = os.path.join(".cache", "categories.db")
+MAX_ENTRIES = 50000
+# Seconds before a hit refreshes an entry's last access time again; keeps hits read-only
+TOUCH_INTERVAL = 3600
+# Bump when rank_categories or the keyword weights change; keyword list edits are detected by themselves
+SCORING_VERSION = 1
+
+def category_key(article):
+    """Cache key of an article: a fingerprint of its title, content and feed category."""
+    text = f"{article.get('title', '')}\0{article.get('content', '')}\0{article.get('feed_category', '')}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def current_rules(matcher=MATCHER):
+    """The keyword rules the matcher uses: category order and (category, keyword) pairs."""
+    return {
+        "categories": matcher.category_names,
+        "keywords": [[matcher.category_names[category], keyword]
+                     for keyword, category in zip(matcher.keywords, matcher.keyword_categories)],
+    }
+
+def rules_version(rules):
+    text = json.dumps({"rules": rules, "scoring": SCORING_VERSION}, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+# Few distinct category lists exist, so their decoded form is shared
+_decode_categories = functools.lru_cache(maxsize=1024)(json.loads)
+
+def _contains_any(article, phrases):
+    """Whether any preprocessed keyword phrase occurs in the article's title or content."""
+    text = f"{article.get('title', '')} {article.get('content', '')}".lower().translate(PUNCTUATION_TABLE)
+    if any(phrase in text for phrase in phrases if " " not in phrase):
+        return True
+    phrases = [phrase for phrase in phrases if " " in phrase]
+    if phrases:
+        text = " ".join(text.split())
+        return any(phrase in text for phrase in phrases)
+    return False
+
+class CategoryCache:
+    """
+    Persistent categorization memo keyed by content fingerprint and rules version.
+    
+    Each entry keeps the article's categories and the keywords that matched
+    it. When CATEGORIES changes, an entry from older rules is revalidated on
+    lookup instead of being thrown away: keywords that were removed or moved
+    are dropped from its matches and the categories re-ranked, so only
+    articles whose text contains one of the added keywords are categorized
+    again. Hit counts of the latest lookup show the hit rate per refresh.
+    """
+    
+    def __init__(self, path=CATEGORY_CACHE_PATH, max_entries=MAX_ENTRIES, matcher=MATCHER):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.matcher = matcher
+        self.rules = current_rules(matcher)
+        self.version = rules_version(self.rules)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.last_lookup = None
+        self._rule_pairs = {tuple(pair) for pair in self.rules["keywords"]}
+        self._changes = {}  # old rules version -> RuleChanges, or None if unknown
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rules (version TEXT PRIMARY KEY, rules TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS categories ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, categories TEXT NOT NULL, "
+                "matches TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_categories_access ON categories (last_access)")
+            self._conn.execute("INSERT OR IGNORE INTO rules (version, rules) VALUES (?, ?)",
+                               (self.version, json.dumps(self.rules)))
+    
+    def close(self):
+        self._conn.close()
+    
+    def _rule_changes(self, version):
+        """
+        What changed since the rules of `version`, or None if those rules are unknown.
+        
+        Returns:
+            (preprocessed keyword phrases added, whether keywords were removed
+            or categories reordered)
+        """
+        if version not in self._changes:
+            row = self._conn.execute("SELECT rules FROM rules WHERE version = ?", (version,)).fetchone()
+            if row is None:
+                self._changes[version] = None
+            else:
+                old_rules = json.loads(row[0])
+                old_pairs = {tuple(pair) for pair in old_rules["keywords"]}
+                added = [preprocess_text(keyword) for _, keyword in self._rule_pairs - old_pairs]
+                rerank = bool(old_pairs - self._rule_pairs) or old_rules["categories"] != self.rules["categories"]
+                self._changes[version] = (added, rerank)
+        return self._changes[version]
+    
+    def _rerank(self, article, matches):
+        """Drop matches of keywords that are gone and rank again; returns (kept matches, categories)."""
+        kept = [match for match in matches if (match[0], match[1]) in self._rule_pairs]
+        scores = dict.fromkeys(self.rules["categories"], 0)
+        for category, _, occurrences, in_title in kept:
+            scores[category] += (5 if in_title else 1) * occurrences
+        return kept, rank_categories({name: score for name, score in scores.items() if score > 0},
+                                     article.get("feed_category", ""))
+    
+    def lookup(self, articles):
+        """
+        Categories of each article, or None where it has to be categorized.
+        
+        Returns:
+            List with one categories list (or None) per article
+        """
+        keys = [category_key(article) for article in articles]
+        now = time.time()
+        results = [None] * len(articles)
+        touched = []
+        upgraded = []
+        reranked = []
+        hits = 0
+        with self._lock, self._conn:
+            rows = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                # Matches are only needed by entries from older rules
+                rows.update((row[0], row[1:]) for row in self._conn.execute(
+                    f"SELECT key, version, categories, last_access, "
+                    f"CASE WHEN version = ? THEN NULL ELSE matches END FROM categories "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})", [self.version] + chunk))
+            
+            for position, (key, article) in enumerate(zip(keys, articles)):
+                row = rows.get(key)
+                if row is None:
+                    continue
+                version, categories, last_access, matches = row
+                if version == self.version:
+                    results[position] = list(_decode_categories(categories))
+                    hits += 1
+                    if now - last_access > TOUCH_INTERVAL:
+                        touched.append((now, key))
+                    continue
+                
+                changes = self._rule_changes(version)
+                if changes is None:
+                    continue
+                added, rerank = changes
+                # Keyword matches are whole tokens, so a phrase missing from the text cannot match
+                if added and _contains_any(article, added):
+                    continue
+                if rerank:
+                    kept, results[position] = self._rerank(article, json.loads(matches))
+                    reranked.append((json.dumps(results[position]), json.dumps(kept), key))
+                else:
+                    results[position] = list(_decode_categories(categories))
+                upgraded.append((self.version, now, key))
+            
+            self._conn.executemany("UPDATE categories SET categories = ?, matches = ? WHERE key = ?", reranked)
+            self._conn.executemany("UPDATE categories SET version = ?, last_access = ? WHERE key = ?", upgraded)
+            self._conn.executemany("UPDATE categories SET last_access = ? WHERE key = ?", touched)
+        
+        revalidated = len(upgraded)
+        misses = len(articles) - hits - revalidated
+        self.hits += hits
+        self.revalidated += revalidated
+        self.misses += misses
+        self.last_lookup = {
+            "hits": hits,
+            "revalidated": revalidated,
+            "misses": misses,
+            "hit_rate": (hits + revalidated) / len(articles) if articles else 0.0,
+        }
+        count("category_cache", hits, result="hit")
+        count("category_cache", revalidated, result="revalidated")
+        count("category_cache", misses, result="miss")
+        METRICS.gauge("category_cache_hit_rate", self.last_lookup["hit_rate"])
+        return results
+    
+    def store(self, entries):
+        """
+        Cache freshly categorized articles, evicting the least recently used entries if full.
+        
+        Args:
+            entries: (categorized article, (text counts, title counts) from match_article) pairs
+        """
+        now = time.time()
+        rows = []
+        for article, (text_counts, title_counts) in entries:
+            matches = [[self.rules["categories"][self.matcher.keyword_categories[keyword_id]],
+                        self.matcher.keywords[keyword_id], occurrences, keyword_id in title_counts]
+                       for keyword_id, occurrences in text_counts.items()]
+            rows.append((category_key(article), self.version, json.dumps(article["categories"]),
+                         json.dumps(matches), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO categories (key, version, categories, matches, last_access) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+            if total > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM categories WHERE key IN "
+                    "(SELECT key FROM categories ORDER BY last_access LIMIT ?)", (total - self.max_entries,)
+                )
+    
+    def stats(self):
+        """Return cache counters, overall and for the latest lookup."""
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            "last_lookup": self.last_lookup,
+        }
@@ -0,0 +1,92 @@
+import re
+import numpy as np
+from article_categorizer import PUNCTUATION_TABLE
+
+# Sentences per summary
+SUMMARY_SENTENCES = 3
+# Feed content with fewer sentences is too thin to summarize locally
+LOCAL_MIN_SENTENCES = SUMMARY_SENTENCES + 1
+# Sentences shorter than this are never picked (bylines, captions, "Read more.")
+MIN_SENTENCE_WORDS = 5
+# News puts the key facts first; the opening sentence's score is scaled by this
+LEAD_BONUS = 1.2
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=["\'“‘(\[]?[A-Z0-9])')
+STOP_WORDS = frozenset(
+    "about after also and are been but can could for from had has have her his how its more not "
+    "now one our out over said says she than that the their them then there these they this was "
+    "were what when where which who will with would you your".split()
+)
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_RE.split(text.strip()) if sentence]
+
+def is_summarizable(content, min_chars, min_sentences=LOCAL_MIN_SENTENCES):
+    """Whether the feed content holds enough text for a local summary."""
+    return len(content) >= min_chars and len(split_sentences(content)) >= min_sentences
+
+def _tokens(sentence):
+    return [token for token in sentence.lower().translate(PUNCTUATION_TABLE).split()
+            if len(token) > 2 and token not in STOP_WORDS]
+
+def extractive_summaries(texts, sentences=SUMMARY_SENTENCES):
+    """
+    Pick the most representative sentences of every text, scored in one batch.
+    
+    Each term is weighted by its frequency in its own text, so sentences
+    about what the article keeps coming back to score highest. Weights never
+    depend on the other `texts`: an article gets the same summary whichever
+    batch it is summarized in, which the summary and render caches rely on.
+    A sentence scores the summed weight of its terms divided by the square
+    root of its length; the best `sentences` of each text are kept in text order.
+    
+    Returns:
+        One summary per text, or None where no sentence is long enough
+    """
+    sentence_texts = []
+    sentence_doc = []
+    for doc, text in enumerate(texts):
+        split = split_sentences(text)
+        sentence_texts.extend(split)
+        sentence_doc.extend([doc] * len(split))
+    if not sentence_texts:
+        return [None] * len(texts)
+    sentence_doc = np.asarray(sentence_doc, dtype=np.int64)
+    
+    vocabulary = {}
+    token_ids = []
+    lengths = np.zeros(len(sentence_texts), dtype=np.int64)
+    for position, sentence in enumerate(sentence_texts):
+        tokens = _tokens(sentence)
+        lengths[position] = len(tokens)
+        token_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+    token_ids = np.asarray(token_ids, dtype=np.int64)
+    token_sentence = np.repeat(np.arange(len(sentence_texts)), lengths)
+    
+    # Weight of each (text, term) pair: the term's frequency in that text
+    token_doc = sentence_doc[token_sentence]
+    vocabulary_size = max(len(vocabulary), 1)
+    pairs, pair_of_token, pair_counts = np.unique(token_doc * vocabulary_size + token_ids,
+                                                  return_inverse=True, return_counts=True)
+    doc_lengths = np.bincount(token_doc, minlength=len(texts))
+    pair_weights = pair_counts / np.maximum(doc_lengths[pairs // vocabulary_size], 1)
+    
+    scores = np.bincount(token_sentence, weights=pair_weights[pair_of_token], minlength=len(sentence_texts))
+    scores /= np.sqrt(np.maximum(lengths, 1))
+    first_of_doc = np.ones(len(sentence_texts), dtype=bool)
+    first_of_doc[1:] = sentence_doc[1:] != sentence_doc[:-1]
+    scores[first_of_doc] *= LEAD_BONUS
+    word_counts = np.fromiter((len(sentence.split()) for sentence in sentence_texts), dtype=np.int64,
+                              count=len(sentence_texts))
+    eligible = word_counts >= MIN_SENTENCE_WORDS
+    
+    # Best sentences per text: order by text, then by descending score, and rank within each text
+    order = np.lexsort((-scores, ~eligible, sentence_doc))
+    doc_starts = np.searchsorted(sentence_doc[order], sentence_doc[order], side="left")
+    rank = np.arange(len(order)) - doc_starts
+    chosen = np.sort(order[(rank < sentences) & eligible[order]])
+    
+    picked = [[] for _ in texts]
+    for doc, position in zip(sentence_doc[chosen].tolist(), chosen.tolist()):
+        picked[doc].append(sentence_texts[position])
+    return [" ".join(parts) if parts else None for parts in picked]
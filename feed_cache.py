@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+# Default location of the on-disk feed cache
+FEED_CACHE_DIR = os.path.join(".cache", "feeds")
+
+class FeedCache:
+    """
+    Persistent per-feed HTTP cache.
+    
+    Stores the ETag and Last-Modified validators of each feed together with the
+    articles parsed from it, so an unchanged feed (HTTP 304) needs no parsing.
+    """
+    
+    def __init__(self, cache_dir=FEED_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def _path(self, feed_url):
+        key = hashlib.sha1(feed_url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def get(self, feed_url):
+        """Return the cached entry for a feed, or None if there is none."""
+        try:
+            with open(self._path(feed_url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        for article in entry["articles"]:
+            article["published"] = datetime.fromisoformat(article["published"])
+        return entry
+    
+    def put(self, feed_url, etag, last_modified, articles, ids=None):
+        """
+        Store the validators and parsed articles of a feed.
+        
+        `ids` lists the GUIDs of every entry in the feed, including entries that
+        were skipped because they were already stored.
+        """
+        if not etag and not last_modified:
+            return
+        
+        entry = {
+            "url": feed_url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "ids": ids,
+            "articles": [dict(article, published=article["published"].isoformat()) for article in articles],
+        }
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(feed_url))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Default location of the persistent feed health state
+FEED_HEALTH_PATH = os.path.join(".cache", "feed_health.json")
+# Consecutive failures after which a feed is skipped, and for how long
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF = 300  # Seconds skipped after the threshold is reached; doubles with every further failure
+MAX_BACKOFF = 6 * 3600
+# Weight of the newest fetch in the latency moving average
+LATENCY_ALPHA = 0.3
+
+class FeedHealth:
+    """
+    Persistent per-feed health with a circuit breaker.
+    
+    Tracks successes, failures, an exponential moving average of fetch
+    latency and the last error of every feed. After FAILURE_THRESHOLD
+    consecutive failures the circuit opens: the feed is skipped without any
+    network call for BASE_BACKOFF seconds, doubling with every further failure
+    up to MAX_BACKOFF. Once the backoff has passed, one fetch is let through;
+    a success closes the circuit again.
+    """
+    
+    def __init__(self, path=FEED_HEALTH_PATH, failure_threshold=FAILURE_THRESHOLD,
+                 base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._feeds = json.load(f)
+        except (OSError, ValueError):
+            self._feeds = {}
+    
+    def _entry(self, feed_url):
+        entry = self._feeds.get(feed_url)
+        if entry is None:
+            entry = self._feeds[feed_url] = {
+                "successes": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "latency_ewma": None,
+                "last_error": None,
+                "last_success": None,
+                "last_failure": None,
+                "open_until": None,
+            }
+        return entry
+    
+    def allow(self, feed_url, now=None):
+        """Whether the feed may be fetched now, i.e. its circuit is not open."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._feeds.get(feed_url)
+            return entry is None or not entry["open_until"] or entry["open_until"] <= now
+    
+    def _record_latency(self, entry, seconds):
+        if entry["latency_ewma"] is None:
+            entry["latency_ewma"] = seconds
+        else:
+            entry["latency_ewma"] += LATENCY_ALPHA * (seconds - entry["latency_ewma"])
+    
+    def record_success(self, feed_url, seconds):
+        with self._lock:
+            entry = self._entry(feed_url)
+            entry["successes"] += 1
+            entry["consecutive_failures"] = 0
+            entry["open_until"] = None
+            entry["last_success"] = time.time()
+            self._record_latency(entry, seconds)
+    
+    def record_failure(self, feed_url, error, seconds):
+        """Record a failed fetch; opens the circuit once the feed keeps failing."""
+        with self._lock:
+            entry = self._entry(feed_url)
+            now = time.time()
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            entry["last_error"] = error
+            entry["last_failure"] = now
+            self._record_latency(entry, seconds)
+            excess = entry["consecutive_failures"] - self.failure_threshold
+            if excess >= 0:
+                entry["open_until"] = now + min(self.base_backoff * 2 ** min(excess, 32), self.max_backoff)
+    
+    def get(self, feed_url):
+        """Health of one feed with its success rate, or None if it was never fetched."""
+        with self._lock:
+            entry = self._feeds.get(feed_url)
+            if entry is None:
+                return None
+            entry = dict(entry)
+        attempts = entry["successes"] + entry["failures"]
+        entry["success_rate"] = entry["successes"] / attempts if attempts else None
+        return entry
+    
+    def report(self):
+        """Health of every known feed, keyed by URL."""
+        with self._lock:
+            urls = list(self._feeds)
+        return {url: self.get(url) for url in urls}
+    
+    def open_circuits(self, now=None):
+        """URLs of the feeds that are currently being skipped."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return [url for url, entry in self._feeds.items() if entry["open_until"] and entry["open_until"] > now]
+    
+    def save(self):
+        """Write the health state to disk atomically."""
+        with self._lock:
+            data = json.dumps(self._feeds)
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
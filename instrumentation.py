@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+# Where the app writes the metrics after each newsletter (.prom/.txt: Prometheus text, else JSON)
+METRICS_FILE = os.environ.get("NEWSLETTER_METRICS_FILE")
+# Take tracemalloc snapshots around each stage; slows the pipeline down noticeably
+TRACE_MEMORY = os.environ.get("NEWSLETTER_TRACE_MEMORY") == "1"
+# Number of individual timings (e.g. per article) kept for inspection
+RECENT_EVENTS = 200
+PROMETHEUS_PREFIX = "newsletter_"
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Metrics:
+    """
+    Thread-safe timers (count, total, max), counters and gauges keyed by name and labels.
+    
+    Stages, feeds and article summaries record into the process-wide METRICS;
+    the data can be read as a dict, written to a file as JSON or Prometheus
+    text, or shown in the app's timing panel.
+    """
+    
+    def __init__(self, recent_events=RECENT_EVENTS):
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+        self._gauges = {}
+        self.recent = deque(maxlen=recent_events)
+        self.trace_memory = TRACE_MEMORY
+    
+    def observe(self, name, seconds, detail=None, **labels):
+        """
+        Record one timing.
+        
+        `labels` are part of the aggregated series; `detail` (e.g. an article
+        link) is only kept with the timing in the recent events.
+        """
+        key = (name, _labels_key(labels))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+            self.recent.append({"name": name, "labels": labels, "detail": detail, "seconds": round(seconds, 6)})
+    
+    @contextmanager
+    def timer(self, name, detail=None, **labels):
+        """Time the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, detail, **labels)
+    
+    def count(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _labels_key(labels))] = value
+    
+    @contextmanager
+    def stage(self, name, **labels):
+        """
+        Time a pipeline stage as `stage_seconds{stage=name}`.
+        
+        With memory tracing on, also records the peak traced memory of the
+        stage as `stage_peak_memory_bytes`; stages running at the same time
+        share one peak, so the figure is an upper bound for each of them.
+        """
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        try:
+            with self.timer("stage_seconds", stage=name, **labels):
+                yield
+        finally:
+            if self.trace_memory and tracemalloc.is_tracing():
+                self.gauge("stage_peak_memory_bytes", tracemalloc.get_traced_memory()[1] - base,
+                           stage=name, **labels)
+    
+    def snapshot(self):
+        """All metrics as plain data."""
+        with self._lock:
+            timers = [{"name": name, "labels": dict(labels), "count": count,
+                       "total_s": round(total, 6), "mean_s": round(total / count, 6), "max_s": round(maximum, 6)}
+                      for (name, labels), (count, total, maximum) in self._timers.items()]
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self._counters.items()]
+            gauges = [{"name": name, "labels": dict(labels), "value": value}
+                      for (name, labels), value in self._gauges.items()]
+            recent = list(self.recent)
+        return {"timers": timers, "counters": counters, "gauges": gauges, "recent": recent}
+    
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, default=str)
+    
+    def to_prometheus(self):
+        """Prometheus text exposition format: timers as summaries plus a `_max` gauge."""
+        with self._lock:
+            timers = sorted(self._timers.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+        
+        lines = []
+        typed = set()
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+        
+        for (name, labels), (count, total, maximum) in timers:
+            metric = PROMETHEUS_PREFIX + name
+            declare(metric, "summary")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {count}")
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {total:.6f}")
+        for (name, labels), (count, total, maximum) in timers:
+            metric = PROMETHEUS_PREFIX + name + "_max"
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {maximum:.6f}")
+        for (name, labels), value in counters:
+            metric = PROMETHEUS_PREFIX + name + "_total"
+            declare(metric, "counter")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            metric = PROMETHEUS_PREFIX + name
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def write(self, path):
+        """Write the metrics to `path` atomically; .prom and .txt files get Prometheus text."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self.recent.clear()
+
+METRICS = Metrics()
+timer = METRICS.timer
+count = METRICS.count
+stage = METRICS.stage
@@ -0,0 +1,152 @@
+"""
+Headless command line for cron and batch jobs.
+
+    python -m newsletter generate --user "Alex Parker" --out alex.md
+    python -m newsletter generate --all --format html --out newsletters/
+    python -m newsletter fetch
+    python -m newsletter users
+
+Pipeline modules are imported inside the commands that use them, so commands
+that do not fetch or summarize start without loading NumPy, feedparser,
+newspaper or NLTK.
+"""
+import argparse
+import os
+import sys
+
+FORMATS = ("markdown", "html", "text")
+# Mirrors article_summarizer.SUMMARY_MODES, which is not imported for argument parsing
+SUMMARY_MODES = ("local", "download")
+FILE_EXTENSIONS = {"markdown": "md", "html": "html", "text": "txt"}
+
+def load_articles(args):
+    """Current articles: refreshed through the persistent store, or fetched directly with --no-store."""
+    if args.no_store:
+        from article_categorizer import categorize_articles
+        from article_deduplicator import deduplicate_articles
+        from category_cache import CategoryCache
+        from feed_health import FeedHealth
+        from rss_parser import FETCH_DEADLINE, fetch_rss_feeds
+        articles = fetch_rss_feeds(concurrent=True, health=FeedHealth(), deadline=FETCH_DEADLINE,
+                                   parse_workers=args.parse_workers)
+        return deduplicate_articles(categorize_articles(articles, batch=True, cache=CategoryCache()))
+
+    from article_store import ArticleStore
+    from category_cache import CategoryCache
+    from feed_cache import FeedCache
+    from feed_health import FeedHealth
+    from pipeline import refresh_articles
+    from rss_parser import FETCH_DEADLINE
+    return refresh_articles(ArticleStore(), FeedCache(), health=FeedHealth(), deadline=FETCH_DEADLINE,
+                            category_cache=CategoryCache(), parse_workers=args.parse_workers)
+
+def write_output(path, text):
+    if path == "-":
+        sys.stdout.write(text)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def output_path(out, user_name, fmt, several):
+    """File for one user's newsletter; with several users `out` is a directory."""
+    if not several:
+        return out
+    return os.path.join(out, f"{user_name.replace(' ', '_')}_newsletter.{FILE_EXTENSIONS[fmt]}")
+
+def write_metrics(path):
+    if path:
+        from instrumentation import METRICS
+        METRICS.write(path)
+
+def command_users(args):
+    from user_preferences import USER_PERSONAS
+    for name, user_data in USER_PERSONAS.items():
+        print(f"{name}: {', '.join(user_data['interests'])}")
+    return 0
+
+def command_fetch(args):
+    articles = load_articles(args)
+    print(f"{len(articles)} articles in the current feeds")
+    write_metrics(args.metrics)
+    return 0
+
+def command_generate(args):
+    from user_preferences import USER_PERSONAS
+    names = list(USER_PERSONAS) if args.all else args.user
+    unknown = [name for name in names if name not in USER_PERSONAS]
+    if unknown:
+        print(f"Unknown user(s): {', '.join(unknown)}. Known users: {', '.join(USER_PERSONAS)}", file=sys.stderr)
+        return 2
+    several = len(names) > 1
+    if several and args.out == "-":
+        print("--out must be a directory when generating for several users", file=sys.stderr)
+        return 2
+
+    articles = load_articles(args)
+    if not articles:
+        print("No articles could be fetched", file=sys.stderr)
+        return 1
+
+    from article_summarizer import SUMMARY_WORKERS
+    from batch_generator import generate_newsletters
+    workers = SUMMARY_WORKERS if args.workers is None else args.workers or None
+    cache = None
+    if not args.no_cache:
+        from summary_cache import SummaryCache
+        cache = SummaryCache()
+    store = None
+    if not args.no_store:
+        from article_store import ArticleStore
+        store = ArticleStore()
+
+    newsletters = generate_newsletters([USER_PERSONAS[name] for name in names], articles, store=store,
+                                       cache=cache, workers=workers, fmt=args.format,
+                                       summary_mode=args.summaries)
+    for name in names:
+        path = output_path(args.out, name, args.format, several)
+        write_output(path, newsletters[name])
+        if path != "-":
+            print(f"Wrote {path}", file=sys.stderr)
+    write_metrics(args.metrics)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m newsletter", description="Personalized newsletter pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("users", help="list the user personas").set_defaults(func=command_users)
+
+    def add_pipeline_options(command):
+        command.add_argument("--no-store", action="store_true",
+                             help="fetch every feed in full instead of refreshing the article store")
+        command.add_argument("--parse-workers", type=int,
+                             help="processes parsing the downloaded feeds (default: parse in the download threads)")
+        command.add_argument("--metrics", help="write timings and counters to this file (.prom for Prometheus text)")
+
+    fetch = commands.add_parser("fetch", help="refresh the article store from the feeds")
+    add_pipeline_options(fetch)
+    fetch.set_defaults(func=command_fetch)
+
+    generate = commands.add_parser("generate", help="generate newsletters")
+    users = generate.add_mutually_exclusive_group(required=True)
+    users.add_argument("--user", action="append", help="user persona name (repeatable)")
+    users.add_argument("--all", action="store_true", help="every user persona")
+    generate.add_argument("--format", choices=FORMATS, default="markdown")
+    generate.add_argument("--out", default="-", help="output file, '-' for stdout, or a directory for several users")
+    generate.add_argument("--workers", type=int, help="concurrent article downloads (0 for serial)")
+    generate.add_argument("--no-cache", action="store_true", help="do not use the summary cache")
+    generate.add_argument("--summaries", choices=SUMMARY_MODES, default="local",
+                          help="summarize long feed content locally, or always download the article pages")
+    add_pipeline_options(generate)
+    generate.set_defaults(func=command_generate)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
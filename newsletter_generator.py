@@ -1,32 +1,20 @@
 from datetime import datetime
+from newsletter_renderer import render_newsletter
 
 def format_date(date_obj):
     """Format a datetime object to a readable date string."""
     return date_obj.strftime("%B %d, %Y")
 
-def generate_newsletter(articles, user_data):
-    """Generate a personalized newsletter in Markdown format."""
-    now = datetime.now()
-    date_str = format_date(now)
-    
-    # Start with header
-    newsletter = f"""# {user_data['name']}'s Personalized Newsletter
-### {date_str}
-
----
-
-"""
-    
-    # Add introduction
-    interests_text = ', '.join(user_data['interests'][:3])
-    newsletter += f"""## Today's Highlights
-Welcome to your personalized newsletter, {user_data['name']}. Here are today's top stories curated just for you based on your interests in {interests_text}, and more.
-
----
+def newsletter_info(user_data):
+    """Build the user details shown in the newsletter header and footer."""
+    return {
+        "name": user_data['name'],
+        "date": format_date(datetime.now()),
+        "interests_text": ', '.join(user_data['interests'][:3]),
+    }
 
-"""
-    
-    # Group articles by category
+def group_by_category(articles):
+    """Group articles by primary category, largest group first."""
     category_articles = {}
     
     for article in articles:
@@ -36,44 +24,56 @@ Welcome to your personalized newsletter, {user_data['name']}. Here are today's t
         category_articles[primary_category].append(article)
     
     # Sort categories by number of articles (descending)
-    sorted_categories = sorted(category_articles.items(), key=lambda x: len(x[1]), reverse=True)
-    
-    # Generate sections for each category
-    for category, cat_articles in sorted_categories:
-        # Add category header with emoji
-        emoji = get_category_emoji(category)
-        newsletter += f"## {emoji} {category}\n\n"
-        
-        # Add articles for this category (up to 4)
-        for i, article in enumerate(cat_articles[:4]):
-            # Format publication date
-            pub_date = format_date(article['published']) if 'published' in article else "Recent"
-            
-            # Add article title with link
-            newsletter += f"### [{article['title']}]({article['link']})\n"
-            newsletter += f"*{article['source']} - {pub_date}*\n\n"
-            
-            # Add article summary
-            if 'summary' in article and article['summary']:
-                newsletter += f"{article['summary']}\n\n"
-            else:
-                newsletter += f"{article['content'][:250]}...\n\n"
-            
-            # Add separator between articles except after the last one
-            if i < len(cat_articles[:4]) - 1:
-                newsletter += "---\n\n"
-            
-        # Add some space between categories
-        newsletter += "\n\n"
+    return sorted(category_articles.items(), key=lambda x: len(x[1]), reverse=True)
+
+def section_articles(cat_articles):
+    """Return the articles of a category that are shown in its section."""
+    return cat_articles[:4]
+
+def build_section(category, cat_articles):
+    """Build the structure of one category section."""
+    articles = []
+    for article in section_articles(cat_articles):
+        # Use the summary, or the start of the content if there is none
+        if 'summary' in article and article['summary']:
+            summary = article['summary']
+        else:
+            summary = f"{article['content'][:250]}..."
+        articles.append({
+            "title": article['title'],
+            "link": article['link'],
+            "source": article['source'],
+            "date": format_date(article['published']) if 'published' in article else "Recent",
+            "summary": summary,
+            "alternate_sources": article.get("alternate_sources") or [],
+        })
+    return {"category": category, "emoji": get_category_emoji(category), "articles": articles}
+
+def build_newsletter(articles, user_data):
+    """
+    Build the format-independent structure of a newsletter.
     
-    # Add personalized closing section
-    newsletter += f"""## Thanks for Reading!
-This newsletter was generated specifically for {user_data['name']} based on personal interests including {interests_text}.
+    The structure is rendered by newsletter_renderer into Markdown, HTML or plain text.
+    """
+    return {
+        "info": newsletter_info(user_data),
+        "sections": [build_section(category, cat_articles) for category, cat_articles in group_by_category(articles)],
+    }
 
-Check back tomorrow for more personalized news.
-"""
+def generate_newsletter(articles, user_data, fmt="markdown", out=None):
+    """
+    Generate a personalized newsletter.
     
-    return newsletter
+    Args:
+        articles: Summarized article dicts
+        user_data: User persona dict
+        fmt: "markdown" (default), "html" or "text"
+        out: Optional writable text stream to write the newsletter to instead of returning it
+        
+    Returns:
+        The newsletter text, or None when written to `out`
+    """
+    return render_newsletter(build_newsletter(articles, user_data), fmt, out)
 
 def get_category_emoji(category):
     """Return an emoji based on the category."""
@@ -0,0 +1,138 @@
+import html
+import io
+from instrumentation import stage
+
+class MarkdownRenderer:
+    """Render a newsletter structure (see newsletter_generator.build_newsletter) as Markdown."""
+    
+    def header(self, info, write):
+        write(f"# {info['name']}'s Personalized Newsletter\n")
+        write(f"### {info['date']}\n\n---\n\n")
+        write("## Today's Highlights\n")
+        write(f"Welcome to your personalized newsletter, {info['name']}. Here are today's top stories "
+              f"curated just for you based on your interests in {info['interests_text']}, and more.\n\n---\n\n")
+    
+    def section(self, section, write):
+        write(f"## {section['emoji']} {section['category']}\n\n")
+        articles = section["articles"]
+        for i, article in enumerate(articles):
+            write(f"### [{article['title']}]({article['link']})\n")
+            write(f"*{article['source']} - {article['date']}*\n\n")
+            if article.get("alternate_sources"):
+                links = ", ".join(f"[{alternate['source']}]({alternate['link']})" for alternate in article["alternate_sources"])
+                write(f"*Also covered by {links}*\n\n")
+            write(f"{article['summary']}\n\n")
+            # Add separator between articles except after the last one
+            if i < len(articles) - 1:
+                write("---\n\n")
+        write("\n\n")
+    
+    def footer(self, info, write):
+        write("## Thanks for Reading!\n")
+        write(f"This newsletter was generated specifically for {info['name']} based on personal "
+              f"interests including {info['interests_text']}.\n\n")
+        write("Check back tomorrow for more personalized news.\n")
+
+class HtmlRenderer:
+    """Render a newsletter structure as a self-contained HTML email body."""
+    
+    def header(self, info, write):
+        name = html.escape(info["name"])
+        write('<!DOCTYPE html>\n<html><head><meta charset="utf-8">')
+        write(f"<title>{name}'s Personalized Newsletter</title></head>\n")
+        write('<body style="font-family: Arial, sans-serif; max-width: 680px; margin: auto;">\n')
+        write(f"<h1>{name}'s Personalized Newsletter</h1>\n")
+        write(f"<h3>{html.escape(info['date'])}</h3>\n<hr>\n")
+        write("<h2>Today's Highlights</h2>\n")
+        write(f"<p>Welcome to your personalized newsletter, {name}. Here are today's top stories "
+              f"curated just for you based on your interests in {html.escape(info['interests_text'])}, "
+              "and more.</p>\n<hr>\n")
+    
+    def section(self, section, write):
+        write(f"<h2>{section['emoji']} {html.escape(section['category'])}</h2>\n")
+        articles = section["articles"]
+        for i, article in enumerate(articles):
+            write(f'<h3><a href="{html.escape(article["link"])}">{html.escape(article["title"])}</a></h3>\n')
+            write(f"<p><em>{html.escape(article['source'])} - {html.escape(article['date'])}</em></p>\n")
+            if article.get("alternate_sources"):
+                links = ", ".join(f'<a href="{html.escape(alternate["link"])}">{html.escape(alternate["source"])}</a>'
+                                  for alternate in article["alternate_sources"])
+                write(f"<p><small>Also covered by {links}</small></p>\n")
+            write(f"<p>{html.escape(article['summary'])}</p>\n")
+            if i < len(articles) - 1:
+                write("<hr>\n")
+    
+    def footer(self, info, write):
+        write("<h2>Thanks for Reading!</h2>\n")
+        write(f"<p>This newsletter was generated specifically for {html.escape(info['name'])} based on "
+              f"personal interests including {html.escape(info['interests_text'])}.</p>\n")
+        write("<p>Check back tomorrow for more personalized news.</p>\n</body></html>\n")
+
+class TextRenderer:
+    """Render a newsletter structure as plain text."""
+    
+    def header(self, info, write):
+        title = f"{info['name']}'s Personalized Newsletter"
+        write(f"{title}\n{'=' * len(title)}\n{info['date']}\n\n")
+        write("Today's Highlights\n------------------\n")
+        write(f"Welcome to your personalized newsletter, {info['name']}. Here are today's top stories "
+              f"curated just for you based on your interests in {info['interests_text']}, and more.\n\n")
+    
+    def section(self, section, write):
+        title = section["category"].upper()
+        write(f"{title}\n{'-' * len(title)}\n\n")
+        for article in section["articles"]:
+            write(f"* {article['title']}\n")
+            write(f"  {article['source']} - {article['date']}\n")
+            if article.get("alternate_sources"):
+                sources = ", ".join(alternate["source"] for alternate in article["alternate_sources"])
+                write(f"  Also covered by {sources}\n")
+            write(f"  {article['link']}\n\n")
+            write(f"  {article['summary']}\n\n")
+    
+    def footer(self, info, write):
+        write("Thanks for Reading!\n-------------------\n")
+        write(f"This newsletter was generated specifically for {info['name']} based on personal "
+              f"interests including {info['interests_text']}.\n\n")
+        write("Check back tomorrow for more personalized news.\n")
+
+RENDERERS = {
+    "markdown": MarkdownRenderer(),
+    "html": HtmlRenderer(),
+    "text": TextRenderer(),
+}
+
+def get_renderer(fmt):
+    """Return the renderer for an output format ("markdown", "html" or "text")."""
+    try:
+        return RENDERERS[fmt]
+    except KeyError:
+        raise ValueError(f"Unknown newsletter format: {fmt}") from None
+
+def render_part(method, data, fmt="markdown"):
+    """Render a single part ("header", "section" or "footer") to a string."""
+    buffer = io.StringIO()
+    getattr(get_renderer(fmt), method)(data, buffer.write)
+    return buffer.getvalue()
+
+def render_newsletter(newsletter, fmt="markdown", out=None):
+    """
+    Render a newsletter structure in one pass.
+    
+    Args:
+        newsletter: Structure from newsletter_generator.build_newsletter
+        fmt: "markdown", "html" or "text"
+        out: Optional writable text stream (file, socket wrapper...); written to directly
+        
+    Returns:
+        The rendered document, or None when written to `out`
+    """
+    renderer = get_renderer(fmt)
+    with stage("generate", format=fmt):
+        buffer = out if out is not None else io.StringIO()
+        write = buffer.write
+        renderer.header(newsletter["info"], write)
+        for section in newsletter["sections"]:
+            renderer.section(section, write)
+        renderer.footer(newsletter["info"], write)
+        return buffer.getvalue() if out is None else None
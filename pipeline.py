@@ -0,0 +1,160 @@
+from datetime import datetime
+from article_categorizer import categorize_articles
+from article_deduplicator import deduplicate_articles
+from article_filter import filter_articles_for_user
+from article_summarizer import SUMMARY_MODE, SUMMARY_WORKERS, iter_summaries
+from newsletter_generator import build_section, group_by_category, newsletter_info, section_articles
+from newsletter_renderer import render_newsletter, render_part
+from render_cache import section_key
+from rss_parser import fetch_rss_feeds
+
+def refresh_articles(store, cache=None, dedupe=True, health=None, deadline=None, category_cache=None,
+                     parse_workers=None):
+    """
+    Fetch the feeds into the store and return the articles currently in them.
+    
+    Without a category cache, only articles that are not stored yet are
+    categorized. With one, every current article goes through the cache, so
+    stored categories follow edits to the keyword rules while unchanged
+    articles are not categorized again.
+    
+    Args:
+        store: ArticleStore
+        cache: Optional FeedCache for conditional requests
+        dedupe: Keep one representative per near-duplicate story, listing the
+            other sources in its 'alternate_sources'
+        health: Optional FeedHealth; feeds that keep failing are skipped for a while
+        deadline: Optional seconds the fetch may take; slower feeds are left for the next refresh
+        category_cache: Optional CategoryCache
+        parse_workers: Optional number of processes parsing the downloaded feeds
+    """
+    refresh_started = datetime.now()
+    new_articles = fetch_rss_feeds(concurrent=True, cache=cache, store=store, health=health, deadline=deadline,
+                                   parse_workers=parse_workers)
+    if category_cache is None:
+        if new_articles:
+            store.set_categories(categorize_articles(new_articles))
+        articles = store.query(seen_since=refresh_started)
+    else:
+        articles = store.query(seen_since=refresh_started)
+        stored = [article["categories"] for article in articles]
+        articles = categorize_articles(articles, cache=category_cache)
+        store.set_categories([article for article, categories in zip(articles, stored)
+                              if article["categories"] != categories])
+    return deduplicate_articles(articles) if dedupe else articles
+
+def select_sections(articles, user_data, index=None):
+    """
+    Filter articles for the user and pick the articles each section shows.
+    
+    Returns:
+        (category, shown articles) pairs in newsletter order
+    """
+    filtered_articles = filter_articles_for_user(articles, user_data, index=index)
+    return [(category, section_articles(cat_articles)) for category, cat_articles in group_by_category(filtered_articles)]
+
+def stream_newsletter(articles, user_data, index=None, store=None, cache=None, workers=SUMMARY_WORKERS,
+                      summary_mode=SUMMARY_MODE, sections=None, render_cache=None, time_budget=None):
+    """
+    Generate a newsletter as a stream of parts.
+    
+    Articles are filtered for the user, then only the articles shown in the
+    newsletter are summarized; each category section is rendered as soon as
+    all of its articles are summarized.
+    
+    Args:
+        articles: Categorized articles
+        user_data: User persona dict
+        index: Optional ArticleIndex over `articles`
+        store, cache, workers: Passed to iter_summaries
+        summary_mode: "local" or "download", passed to iter_summaries as `mode`
+        sections: Result of select_sections, if already computed
+        render_cache: Optional RenderCache; sections whose articles are
+            unchanged come from it without summarizing, and new ones are added
+        time_budget: Optional seconds summarization may take. Articles are
+            then summarized in relevance order, and those not reached in time
+            show their feed content snippet. Sections with any feed content
+            snippet in place of a summary are not cached
+        
+    Yields:
+        Dicts with a "type" key:
+        - "layout": "categories" lists the section categories in newsletter order
+        - "header" / "footer": "info" (user details) and "content", the Markdown of that part
+        - "section": "position", "category", "section" (structure), "content" (Markdown)
+          of a finished section, "degraded", the links of its articles that
+          fell back to a snippet because the time budget ran out, and "fallback",
+          the links of all its articles that show a snippet for any reason
+    """
+    if sections is None:
+        sections = select_sections(articles, user_data, index)
+    
+    yield {"type": "layout", "categories": [category for category, _ in sections]}
+    info = newsletter_info(user_data)
+    yield {"type": "header", "info": info, "content": render_part("header", info)}
+    
+    def section_part(position, section, degraded=(), fallback=()):
+        return {
+            "type": "section",
+            "position": position,
+            "category": section["category"],
+            "section": section,
+            "content": render_part("section", section),
+            "degraded": list(degraded),
+            "fallback": list(fallback),
+        }
+    
+    # Summarize section by section so the first sections finish first
+    slots = []
+    to_summarize = []
+    for position, (category, shown) in enumerate(sections):
+        cached_section = render_cache.get(section_key(category, shown)) if render_cache else None
+        if cached_section is not None:
+            yield section_part(position, cached_section)
+            continue
+        for slot, article in enumerate(shown):
+            slots.append((position, slot))
+            to_summarize.append(article)
+    if time_budget is not None:
+        # Most relevant first, so the articles the budget does not reach matter least
+        order = sorted(range(len(to_summarize)), key=lambda i: -(to_summarize[i].get("relevance_score") or 0))
+        slots = [slots[i] for i in order]
+        to_summarize = [to_summarize[i] for i in order]
+    
+    summarized = [list(shown) for _, shown in sections]
+    remaining = [len(shown) for _, shown in sections]
+    for summary_index, summarized_article in iter_summaries(to_summarize, store=store, workers=workers, cache=cache,
+                                                            mode=summary_mode, time_budget=time_budget):
+        position, slot = slots[summary_index]
+        summarized[position][slot] = summarized_article
+        remaining[position] -= 1
+        if remaining[position] == 0:
+            category, shown = sections[position]
+            section = build_section(category, summarized[position])
+            degraded = [article.get("link") for article in summarized[position] if article.get("summary_degraded")]
+            # Snippets stand in for summaries that failed or ran out of time; the next run retries them
+            fallback = [article.get("link") for article in summarized[position]
+                        if article.get("summary_fallback") or article.get("summary_degraded")]
+            if render_cache and not fallback:
+                render_cache.put(section_key(category, shown), section)
+            yield section_part(position, section, degraded, fallback)
+    
+    yield {"type": "footer", "info": info, "content": render_part("footer", info)}
+
+def assemble_newsletter(parts, fmt="markdown", out=None):
+    """
+    Render streamed newsletter parts as one document.
+    
+    Args:
+        parts: Parts yielded by stream_newsletter
+        fmt: "markdown", "html" or "text"
+        out: Optional writable text stream to write to instead of returning a string
+    """
+    info = None
+    sections = {}
+    for part in parts:
+        if part["type"] == "header":
+            info = part["info"]
+        elif part["type"] == "section":
+            sections[part["position"]] = part["section"]
+    newsletter = {"info": info, "sections": [sections[position] for position in sorted(sections)]}
+    return render_newsletter(newsletter, fmt, out)
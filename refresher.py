@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import datetime
+from article_filter import ArticleIndex
+from instrumentation import count, timer
+
+# Seconds between background refreshes of the article set
+REFRESH_INTERVAL = 1800
+
+class ArticleSnapshot:
+    """An article set and its index, replaced as a whole and never modified."""
+    
+    __slots__ = ("articles", "index", "refreshed_at", "refresh_seconds")
+    
+    def __init__(self, articles, refreshed_at, refresh_seconds):
+        self.articles = articles
+        self.index = ArticleIndex(articles)
+        self.refreshed_at = refreshed_at
+        self.refresh_seconds = refresh_seconds
+
+class ArticleRefresher:
+    """
+    Keep the article set warm with stale-while-revalidate serving.
+    
+    A daemon thread reloads the articles every `interval` seconds. Readers
+    always get the last good snapshot immediately, even while a refresh runs;
+    a finished refresh swaps in a new snapshot in one assignment, and a failed
+    one keeps the previous snapshot. At most one refresh is in flight: asking
+    for a refresh while one runs joins it instead of starting another.
+    """
+    
+    def __init__(self, load, interval=REFRESH_INTERVAL):
+        """
+        Args:
+            load: Callable returning the current list of categorized articles
+            interval: Seconds between background refreshes
+        """
+        self.load = load
+        self.interval = interval
+        self.last_error = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._in_flight = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    @property
+    def refreshing(self):
+        return self._in_flight is not None
+    
+    def snapshot(self, wait=True, timeout=None):
+        """
+        Return the current snapshot.
+        
+        Before the first refresh has finished there is nothing to serve; with
+        `wait` the call starts (or joins) that refresh and blocks until it
+        ends, otherwise it returns None.
+        """
+        snapshot = self._snapshot
+        if snapshot is None and wait:
+            self.refresh(wait=True, timeout=timeout)
+            snapshot = self._snapshot
+        return snapshot
+    
+    def refresh(self, wait=False, timeout=None):
+        """
+        Start a refresh unless one is already running.
+        
+        Returns:
+            True if this call started a refresh, False if it joined one in flight
+        """
+        with self._lock:
+            thread = self._in_flight
+            started = thread is None
+            if started:
+                thread = threading.Thread(target=self._refresh, name="article-refresh", daemon=True)
+                self._in_flight = thread
+                thread.start()
+        if wait:
+            thread.join(timeout)
+        return started
+    
+    def _refresh(self):
+        try:
+            start = time.perf_counter()
+            with timer("refresh_seconds"):
+                articles = self.load()
+                snapshot = ArticleSnapshot(articles, datetime.now(), time.perf_counter() - start)
+            # Keep serving the previous articles if the feeds all failed
+            if articles or self._snapshot is None:
+                self._snapshot = snapshot
+                self.last_error = None
+                count("refreshes", result="ok")
+            else:
+                self.last_error = "No articles fetched"
+                count("refreshes", result="empty")
+        except Exception as e:
+            self.last_error = str(e)
+            count("refreshes", result="error")
+        finally:
+            with self._lock:
+                self._in_flight = None
+    
+    def start(self):
+        """Refresh now and then every `interval` seconds on a daemon thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="article-refresher", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self.refresh(wait=True)
+            if self._stop.wait(self.interval):
+                break
+    
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
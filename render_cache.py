@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from article_store import article_id
+from instrumentation import count
+
+# Default location of the optional disk backend, and the in-memory budget
+RENDER_CACHE_PATH = os.path.join(".cache", "renders.db")
+MAX_BYTES = 32 * 2**20
+MAX_DISK_ENTRIES = 5000
+
+def article_version(article):
+    """Fingerprint of the article fields a newsletter section shows or summarizes."""
+    text = "\0".join(map(str, (article.get("title"), article.get("link"), article.get("source"),
+                               article.get("published"), article.get("content"), article.get("alternate_sources"))))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, default=str).encode("utf-8")).hexdigest()
+
+def section_key(category, articles):
+    """Cache key of a section: its category and the ids and versions of the articles it shows."""
+    return "section:" + _digest([category, [[article_id(article), article_version(article)] for article in articles]])
+
+def newsletter_key(user_data, sections, info, fmt):
+    """
+    Cache key of a whole newsletter.
+    
+    Args:
+        user_data: User persona dict; its interests and sources select the articles
+        sections: (category, shown articles) pairs in newsletter order
+        info: Header details from newsletter_info, which include the date
+        fmt: "markdown", "html" or "text"
+    """
+    return "newsletter:" + _digest([
+        sorted(user_data.get("interests", [])),
+        sorted(user_data.get("sources", [])),
+        info,
+        [section_key(category, articles) for category, articles in sections],
+        fmt,
+    ])
+
+def _size(value):
+    return len(value) if isinstance(value, str) else len(json.dumps(value, default=str))
+
+class RenderCache:
+    """
+    LRU cache of rendered newsletters and built sections, bounded by size.
+    
+    Whole newsletters are keyed by persona, selected articles and format, so a
+    repeated request is served without filtering, summarizing or rendering
+    again; sections are keyed by their articles, so a newsletter where only
+    some sections changed rebuilds just those. With a `path`, entries are
+    also written to SQLite and survive restarts; memory stays the first tier.
+    """
+    
+    def __init__(self, max_bytes=MAX_BYTES, path=None, max_disk_entries=MAX_DISK_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS renders ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_renders_access ON renders (last_access)")
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+    
+    def _remember(self, key, value):
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+    
+    def get(self, key):
+        """Return the cached newsletter or section, or None."""
+        kind = key.split(":", 1)[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                value = entry[0]
+            elif self._conn is not None:
+                with self._conn:
+                    row = self._conn.execute("SELECT value FROM renders WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        self._conn.execute("UPDATE renders SET last_access = ? WHERE key = ?", (time.time(), key))
+                value = json.loads(row[0]) if row else None
+                if value is not None:
+                    self._remember(key, value)
+            else:
+                value = None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        count("render_cache", result="hit" if value is not None else "miss", kind=kind)
+        return value
+    
+    def put(self, key, value):
+        """Store a rendered newsletter (string) or a built section (dict)."""
+        with self._lock:
+            self._remember(key, value)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO renders (key, value, last_access) VALUES (?, ?, ?)",
+                                       (key, json.dumps(value, default=str), time.time()))
+                    total = self._conn.execute("SELECT COUNT(*) FROM renders").fetchone()[0]
+                    if total > self.max_disk_entries:
+                        self._conn.execute(
+                            "DELETE FROM renders WHERE key IN "
+                            "(SELECT key FROM renders ORDER BY last_access LIMIT ?)", (total - self.max_disk_entries,)
+                        )
+    
+    def stats(self):
+        """Return cache counters and the memory in use."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
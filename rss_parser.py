@@ -1,11 +1,27 @@
 import feedparser
-import pandas as pd
+import html
 from datetime import datetime, timedelta
 import re
 import time
+import threading
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from article_store import article_id
+from instrumentation import count, stage, timer
+from article_record import ArticleRecord
+from worker_pools import discard_pool, shared_pool
 # Use a timeout for all requests to avoid hanging
 TIMEOUT = 10
+# Limits for the concurrent fetch mode
+MAX_WORKERS = 8  # Global limit on feeds fetched at the same time
+PER_HOST_LIMIT = 1  # Concurrent requests allowed against a single host
+PER_HOST_DELAY = 0.3  # Minimum seconds between two fetches from the same host
+POOL_HOSTS = 32  # Number of hosts whose connections the shared session keeps alive
+FETCH_DEADLINE = 60  # Seconds a whole refresh may take when a deadline is requested
 # RSS Feed URLs - organized by category with more entertainment sources
 RSS_FEEDS = {
     "General News": [
@@ -42,117 +58,431 @@ RSS_FEEDS = {
         "https://arstechnica.com/science/feed/"
     ]
 }
-def clean_html(raw_html):
-    """Remove HTML tags from text."""
-    clean_regex = re.compile('<.*?>')
-    clean_text = re.sub(clean_regex, '', raw_html)
-    # Also remove multiple spaces and newlines
-    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+# Tags that separate words; other tags are removed without leaving a space
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "img", "li", "main",
+    "nav", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+])
+HIDDEN_RE = re.compile(r"<(script|style)\b.*?</\1\s*>|<!--.*?-->", re.S | re.I)
+HIDDEN_START_RE = re.compile(r"<(?:script|style)\b|<!--", re.I)
+BLOCK_TAG_RE = re.compile(
+    r"</?(?:%s)\b[^>]*>" % "|".join(sorted(BLOCK_TAGS, key=len, reverse=True)), re.I
+)
+# A lone "<" in text (as in "a < b") is not a tag
+TAG_RE = re.compile(r"<[A-Za-z/!?][^>]*>")
+# Maximum length of the cleaned content kept for each entry
+MAX_CONTENT_LENGTH = 10000
+# Longest named character reference, "&CounterClockwiseContourIntegral;"
+MAX_ENTITY_LENGTH = 33
+# Article fields of the entry rows parse_feed_bytes returns, in row order
+ENTRY_FIELDS = ("title", "link", "guid", "published", "content")
+def _html_to_text(raw_html):
+    """Strip markup, decode entities and collapse whitespace."""
+    if "<" in raw_html:
+        if HIDDEN_START_RE.search(raw_html):
+            raw_html = HIDDEN_RE.sub(" ", raw_html)
+            # Whatever follows an unclosed script, style or comment is not text
+            unclosed = HIDDEN_START_RE.search(raw_html)
+            if unclosed:
+                raw_html = raw_html[:unclosed.start()]
+        raw_html = TAG_RE.sub("", BLOCK_TAG_RE.sub(" ", raw_html))
+    if "&" in raw_html:
+        raw_html = html.unescape(raw_html)
+    return " ".join(raw_html.split())
+def clean_html(raw_html, max_length=None):
+    """
+    Convert HTML to plain text.
+    
+    Drops script and style bodies and comments, strips tags (block tags such as
+    <p> and <br> separate words), decodes entities and collapses whitespace.
+    With `max_length`, only as much of the input as is needed to fill that many
+    characters is cleaned, and the result is cut to that length.
+    """
+    if max_length is not None:
+        window = max_length * 4
+        while window < len(raw_html):
+            # Cut before the last tag in the window so no tag is split in half,
+            # and before an entity the cut would split
+            cut = raw_html.rfind("<", 0, window)
+            if cut < 0:
+                cut = window
+            entity = raw_html.rfind("&", max(0, cut - MAX_ENTITY_LENGTH), cut)
+            if entity >= 0 and ";" not in raw_html[entity:cut]:
+                cut = entity
+            clean_text = _html_to_text(raw_html[:cut])
+            if len(clean_text) > max_length:
+                return clean_text[:max_length].rstrip()
+            window *= 2
+    
+    clean_text = _html_to_text(raw_html)
+    if max_length is not None:
+        clean_text = clean_text[:max_length].rstrip()
     return clean_text
-def check_url_availability(url):
-    """Check if a URL is available and reachable."""
-    try:
-        response = requests.head(url, timeout=TIMEOUT)
-        return response.status_code < 400  # Return True for successful status codes
-    except Exception:
-        return False
-def parse_feed(feed_url, category):
-    """Parse a single RSS feed and extract articles."""
+_session = None
+_session_lock = threading.Lock()
+def get_session():
+    """Return the shared HTTP session used for all feed downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # One connection pool per feed host, sized for every concurrent worker
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "Mozilla/5.0"
+            _session = session
+    return _session
+def entry_id(entry):
+    """Return the GUID of a feed entry, falling back to its link."""
+    return entry.get('id') or entry.get('link')
+def _record_outcome(health, feed_url, started, result, error=None):
+    """
+    Count a feed result and record it in the feed's health.
+    
+    Running out of the refresh deadline says nothing about the feed itself,
+    so "deadline" results are only counted.
+    """
+    count("feed_results", result=result)
+    if health and result != "deadline":
+        if error is None:
+            health.record_success(feed_url, time.monotonic() - started)
+        else:
+            health.record_failure(feed_url, error, time.monotonic() - started)
+def _request_timeout(deadline_at):
+    """Request timeout that does not run past the refresh deadline."""
+    if deadline_at is None:
+        return TIMEOUT
+    return max(0.1, min(TIMEOUT, deadline_at - time.monotonic()))
+def parse_feed_bytes(content, response_headers, feed_url):
+    """
+    Parse downloaded feed bytes and extract up to 10 entries.
+    
+    Pure CPU work on plain values, so it can run in a worker process; the
+    result is made of tuples, strings and datetimes that pickle cheaply.
+    
+    Returns:
+        None if the feed is empty or unparseable, else (source, entry ids of
+        the first 10 entries, rows, number of entries that failed), where
+        each row holds an entry's ENTRY_FIELDS values
+    """
+    feed = feedparser.parse(content, response_headers=response_headers)
+    if not feed or not feed.entries:
+        return None
+    
+    # Get source name from feed title or domain
+    if hasattr(feed.feed, 'title') and feed.feed.title:
+        source = feed.feed.title
+    else:
+        source = feed_url.split("/")[2]
+    
+    # Clean up source name
+    source = source.replace('RSS Feed', '').strip()
+    if ' - ' in source:
+        source = source.split(' - ')[0].strip()
+    
+    entries = feed.entries[:10]  # Limit to 10 articles per feed
+    
+    rows = []
+    entry_errors = 0
+    for entry in entries:
+        try:
+            # Extract publication date
+            published = None
+            for date_attr in ['published_parsed', 'updated_parsed', 'created_parsed']:
+                if hasattr(entry, date_attr) and getattr(entry, date_attr):
+                    published = datetime(*getattr(entry, date_attr)[:6])
+                    break
+            
+            # If no date found, use current time
+            if not published:
+                published = datetime.now()
+            
+            # Extract article content
+            content = ""
+            # Try different content fields
+            if hasattr(entry, 'content') and entry.content:
+                content = entry.content[0].value
+            elif hasattr(entry, 'summary'):
+                content = entry.summary
+            elif hasattr(entry, 'description'):
+                content = entry.description
+            else:
+                content = ""
+            
+            # Clean content
+            content = clean_html(content, MAX_CONTENT_LENGTH)
+            
+            # Ensure minimum content length
+            if not content or len(content) < 50:
+                content = f"This is an article from {source} about {entry.title}."
+            
+            # Get the URL
+            link = entry.link if hasattr(entry, 'link') else None
+            if not link:
+                continue
+            
+            title = entry.title if hasattr(entry, 'title') else "Untitled Article"
+            rows.append((title, link, entry_id(entry), published, content))
+        except Exception as e:
+            print(f"Error processing entry in {feed_url}: {str(e)}")
+            entry_errors += 1
+            continue
+    
+    return source, [entry_id(entry) for entry in entries], rows, entry_errors
+def parse_feed(feed_url, category, cache=None, store=None, health=None, deadline_at=None, parse_pool=None):
+    """
+    Parse a single RSS feed and extract articles.
+    
+    The feed is downloaded once through the shared session and the bytes are
+    handed to feedparser. With a FeedCache, the request is conditional and an
+    unchanged feed (HTTP 304) returns the cached articles without parsing.
+    With an ArticleStore, entries already in the store are only marked as seen;
+    new entries are inserted and only those are returned.
+    
+    With a FeedHealth, the outcome and latency are recorded for the feed.
+    `deadline_at` (a time.monotonic() value) caps the request timeout; a feed
+    that finishes after it is discarded without touching the cache or store.
+    With a `parse_pool` (a ProcessPoolExecutor), parse_feed_bytes runs in it
+    while this thread waits, at most until `deadline_at`, so parsing uses
+    other cores.
+    """
+    started = time.monotonic()
+    timeout = _request_timeout(deadline_at)
     try:
-        # First check if the URL is accessible
-        if not check_url_availability(feed_url):
+        cached = cache.get(feed_url) if cache else None
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        
+        response = get_session().get(feed_url, headers=headers, timeout=timeout)
+        
+        # Feed has not changed since the last download
+        if response.status_code == 304 and cached:
+            if deadline_at is not None and time.monotonic() > deadline_at:
+                _record_outcome(health, feed_url, started, "deadline")
+                return []
+            _record_outcome(health, feed_url, started, "not_modified")
+            articles = [ArticleRecord(article, feed_category=category) for article in cached["articles"]]
+            if store:
+                ids = cached.get("ids") or [article_id(article) for article in articles]
+                known = store.touch(ids)
+                articles = store.add_articles([a for a in articles if article_id(a) not in known])
+            return articles
+        
+        if response.status_code >= 400:
             print(f"URL not accessible: {feed_url}")
+            _record_outcome(health, feed_url, started, "http_error", f"HTTP {response.status_code}")
             return []
             
-        feed = feedparser.parse(feed_url)
+        # feedparser expects lower-case header names
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        if parse_pool is None:
+            parsed = parse_feed_bytes(response.content, response_headers, feed_url)
+        else:
+            future = parse_pool.submit(parse_feed_bytes, response.content, response_headers, feed_url)
+            try:
+                parsed = future.result(timeout=None if deadline_at is None
+                                       else max(0, deadline_at - time.monotonic()))
+            except FutureTimeoutError:
+                # The pool outlives the refresh: drop the parse if it has not started, let it finish otherwise
+                future.cancel()
+                _record_outcome(health, feed_url, started, "deadline")
+                return []
+            except BrokenExecutor:
+                discard_pool(parse_pool)
+                raise
         
         # Handle error in parsing
-        if not feed or not feed.entries:
+        if parsed is None:
             print(f"Error parsing feed or empty feed: {feed_url}")
+            _record_outcome(health, feed_url, started, "empty", "Empty or unparseable feed")
             return []
+        source, ids, rows, entry_errors = parsed
+        if entry_errors:
+            count("feed_entry_errors", entry_errors)
         
-        articles = []
-        # Get source name from feed title or domain
-        if hasattr(feed.feed, 'title') and feed.feed.title:
-            source = feed.feed.title
-        else:
-            source = feed_url.split("/")[2]
+        # Skip entries that are already stored
+        known = set()
+        if store:
+            known = store.touch(guid for guid in ids if guid)
         
-        # Clean up source name
-        source = source.replace('RSS Feed', '').strip()
-        if ' - ' in source:
-            source = source.split(' - ')[0].strip()
+        articles = [ArticleRecord(zip(ENTRY_FIELDS, row), source=source, feed_category=category,
+                                  categories=[])  # Categories will be filled by the categorizer
+                    for row in rows if row[2] not in known]
         
-        for entry in feed.entries[:10]:  # Limit to 10 articles per feed
-            try:
-                # Extract publication date
-                published = None
-                for date_attr in ['published_parsed', 'updated_parsed', 'created_parsed']:
-                    if hasattr(entry, date_attr) and getattr(entry, date_attr):
-                        published = datetime(*getattr(entry, date_attr)[:6])
-                        break
-                
-                # If no date found, use current time
-                if not published:
-                    published = datetime.now()
-                
-                # Extract article content
-                content = ""
-                # Try different content fields
-                if hasattr(entry, 'content') and entry.content:
-                    content = entry.content[0].value
-                elif hasattr(entry, 'summary'):
-                    content = entry.summary
-                elif hasattr(entry, 'description'):
-                    content = entry.description
-                else:
-                    content = ""
-                
-                # Clean content
-                content = clean_html(content)
-                
-                # Ensure minimum content length
-                if not content or len(content) < 50:
-                    content = f"This is an article from {source} about {entry.title}."
-                
-                # Get the URL
-                link = entry.link if hasattr(entry, 'link') else None
-                if not link:
-                    continue
-                
-                article = {
-                    "title": entry.title if hasattr(entry, 'title') else "Untitled Article",
-                    "link": link,
-                    "published": published,
-                    "content": content,
-                    "source": source,
-                    "feed_category": category,
-                    "categories": []  # Will be filled by the categorizer
-                }
-                
-                articles.append(article)
-            except Exception as e:
-                print(f"Error processing entry in {feed_url}: {str(e)}")
-                continue
-            
+        # Too late for this refresh; leave the cache and store as they were
+        if deadline_at is not None and time.monotonic() > deadline_at:
+            _record_outcome(health, feed_url, started, "deadline")
+            return []
+        
+        if cache:
+            cache.put(feed_url, response.headers.get("ETag"), response.headers.get("Last-Modified"), articles,
+                      ids=ids)
+        
+        if store:
+            articles = store.add_articles(articles)
+        
+        _record_outcome(health, feed_url, started, "ok")
         return articles
     
     except Exception as e:
         print(f"Error parsing feed {feed_url}: {str(e)}")
+        # A request cut short by the refresh deadline is not held against the feed
+        cut_short = deadline_at is not None and time.monotonic() >= deadline_at
+        _record_outcome(health, feed_url, started, "deadline" if cut_short else "error", str(e))
         return []
-def fetch_rss_feeds():
-    """Fetch articles from all RSS feeds."""
+class HostLimiter:
+    """Per-host politeness: cap concurrent requests and space them out in time."""
+    
+    def __init__(self, per_host_limit=PER_HOST_LIMIT, delay=PER_HOST_DELAY):
+        self.per_host_limit = per_host_limit
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_slot = {}
+    
+    @contextmanager
+    def limit(self, url):
+        """Hold a request slot for the host of `url` for the duration of the block."""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.per_host_limit)
+                self._semaphores[host] = semaphore
+        
+        with semaphore:
+            # Reserve the next start time for this host before sleeping so
+            # that waiting threads queue up behind each other
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+def _fetch_feed(feed_url, category, cache, store, health, deadline_at, limiter=None, parse_pool=None):
+    """Fetch one feed unless its circuit is open or the refresh deadline has passed."""
+    if health and not health.allow(feed_url):
+        count("feed_results", result="circuit_open")
+        return []
+    with limiter.limit(feed_url) if limiter else nullcontext():
+        if deadline_at is not None and time.monotonic() >= deadline_at:
+            count("feed_results", result="deadline")
+            return []
+        with timer("feed_seconds", feed=feed_url):
+            return parse_feed(feed_url, category, cache, store, health, deadline_at, parse_pool)
+def _deadline_at(deadline):
+    return None if deadline is None else time.monotonic() + deadline
+def _fetch_serial(cache, store, health=None, deadline=None):
+    """Fetch all feeds one after another."""
+    deadline_at = _deadline_at(deadline)
     all_articles = []
     
-    for category, feed_urls in RSS_FEEDS.items():
-        category_articles = []
-        for feed_url in feed_urls:
-            # Add a small delay to avoid hammering servers
-            time.sleep(0.3)
-            articles = parse_feed(feed_url, category)
-            category_articles.extend(articles)
-            
-        all_articles.extend(category_articles)
+    jobs = [(feed_url, category)
+            for category, feed_urls in RSS_FEEDS.items()
+            for feed_url in feed_urls]
+    
+    for position, (feed_url, category) in enumerate(jobs):
+        if deadline_at is not None and time.monotonic() >= deadline_at:
+            # Skip the remaining feeds instead of sleeping before each one
+            skipped = len(jobs) - position
+            count("feed_results", skipped, result="deadline")
+            print(f"Refresh deadline reached; {skipped} feeds skipped")
+            break
+        # Add a small delay to avoid hammering servers
+        time.sleep(0.3 if deadline_at is None else min(0.3, max(0, deadline_at - time.monotonic())))
+        all_articles.extend(_fetch_feed(feed_url, category, cache, store, health, deadline_at))
+    
+    if health:
+        health.save()
+    return all_articles
+def iter_rss_feeds(cache=None, store=None, max_workers=MAX_WORKERS,
+                   per_host_limit=PER_HOST_LIMIT, per_host_delay=PER_HOST_DELAY, health=None, deadline=None,
+                   parse_workers=None):
+    """
+    Fetch all feeds concurrently, yielding each feed's articles as soon as it is parsed.
+    
+    Takes the same arguments as fetch_rss_feeds. When the deadline passes,
+    feeds that have not started are cancelled and the stream ends without
+    waiting for the ones still running.
+    
+    Yields:
+        (position of the feed in RSS_FEEDS order, list of article dicts) pairs
+    """
+    deadline_at = _deadline_at(deadline)
+    limiter = HostLimiter(per_host_limit, per_host_delay)
+    
+    jobs = [(feed_url, category)
+            for category, feed_urls in RSS_FEEDS.items()
+            for feed_url in feed_urls]
+    
+    # Downloads stay on threads; feedparser and clean_html hold the GIL, so parsing goes to processes
+    parse_pool = shared_pool("parse", parse_workers) if parse_workers else None
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(_fetch_feed, feed_url, category, cache, store, health, deadline_at, limiter,
+                                   parse_pool): position
+                   for position, (feed_url, category) in enumerate(jobs)}
+        timeout = None if deadline_at is None else max(0, deadline_at - time.monotonic())
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                yield futures[future], future.result()
+        except FutureTimeoutError:
+            # Feeds still running discard their own results once they finish
+            skipped = sum(future.cancel() for future in futures)
+            if skipped:
+                count("feed_results", skipped, result="deadline")
+            print(f"Refresh deadline reached; {skipped} feeds skipped, "
+                  f"{sum(not future.done() for future in futures)} still running")
+    finally:
+        executor.shutdown(wait=deadline_at is None, cancel_futures=True)
+        if health:
+            health.save()
+def _fetch_concurrent(cache, store, max_workers, per_host_limit, per_host_delay, health=None, deadline=None,
+                      parse_workers=None):
+    """Fetch all feeds on a bounded thread pool with per-host limits."""
+    feeds = dict(iter_rss_feeds(cache, store, max_workers, per_host_limit, per_host_delay, health, deadline,
+                                parse_workers))
+    
+    # Concatenate in RSS_FEEDS order so the result matches the serial path
+    all_articles = []
+    for position in sorted(feeds):
+        all_articles.extend(feeds[position])
+    
+    return all_articles
+def fetch_rss_feeds(concurrent=False, cache=None, store=None, max_workers=MAX_WORKERS,
+                    per_host_limit=PER_HOST_LIMIT, per_host_delay=PER_HOST_DELAY, health=None, deadline=None,
+                    parse_workers=None):
+    """
+    Fetch articles from all RSS feeds.
+    
+    Args:
+        concurrent: Fetch feeds in parallel instead of one at a time
+        cache: Optional FeedCache for conditional requests
+        store: Optional ArticleStore; only articles not stored yet are returned
+        max_workers: Maximum number of feeds fetched at once (concurrent mode)
+        per_host_limit: Maximum concurrent requests per host (concurrent mode)
+        per_host_delay: Minimum seconds between requests to one host (concurrent mode)
+        health: Optional FeedHealth; feeds with an open circuit are skipped without a request
+        deadline: Optional seconds the whole refresh may take; feeds not done by then are skipped
+        parse_workers: Processes parsing the downloaded feeds (concurrent mode); None parses
+            in the fetching threads, which the GIL serializes
+        
+    Returns:
+        List of article dicts sorted newest first
+    """
+    with stage("fetch"):
+        if concurrent:
+            all_articles = _fetch_concurrent(cache, store, max_workers, per_host_limit, per_host_delay,
+                                             health, deadline, parse_workers)
+        else:
+            all_articles = _fetch_serial(cache, store, health, deadline)
     
     # Sort all articles by publication date (newest first)
     all_articles.sort(key=lambda x: x["published"], reverse=True)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Default location and limits of the summary cache
+SUMMARY_CACHE_PATH = os.path.join(".cache", "summaries.db")
+MAX_ENTRIES = 5000
+TTL = 7 * 24 * 3600  # Seconds before a cached summary expires
+
+def summary_key(article):
+    """Cache key of an article: its link plus a fingerprint of its feed content."""
+    content_hash = hashlib.sha256(article.get("content", "").encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{article.get('link', '')}\0{content_hash}".encode("utf-8")).hexdigest()
+
+class SummaryCache:
+    """
+    Disk-backed summary cache with LRU eviction and TTL expiry.
+    
+    Summaries are keyed by link and content fingerprint, so an article that
+    changes in its feed is summarized again. Hit and miss counters show how
+    much download and NLP work the cache saves.
+    """
+    
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_entries=MAX_ENTRIES, ttl=TTL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_access ON summaries (last_access)")
+    
+    def close(self):
+        self._conn.close()
+    
+    def get(self, article):
+        """Return the cached summary of an article, or None."""
+        key = summary_key(article)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT summary, created FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+    
+    def put(self, article, summary):
+        """Store the summary of an article, evicting the least recently used entries if full."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created, last_access) VALUES (?, ?, ?, ?)",
+                (summary_key(article), summary, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE key IN "
+                    "(SELECT key FROM summaries ORDER BY last_access LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+    
+    def stats(self):
+        """Return cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
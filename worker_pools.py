@@ -0,0 +1,43 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Workers are started from a clean server process, never forked from the multithreaded app,
+# where a lock held by another thread at fork time would stay locked in the child
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_pools = {}
+_lock = threading.Lock()
+
+def shared_pool(name, max_workers=None):
+    """
+    Return the long-lived process pool `name`, starting it on first use.
+
+    Every caller of the same name and size shares one pool for the life of
+    the process, so requests do not pay for starting processes; pools are
+    shut down at exit.
+    """
+    key = (name, max_workers)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(START_METHOD))
+            _pools[key] = pool
+        return pool
+
+def discard_pool(pool):
+    """Forget a pool that broke (a worker died), so the next shared_pool call starts a new one."""
+    with _lock:
+        for key, current in list(_pools.items()):
+            if current is pool:
+                del _pools[key]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+@atexit.register
+def _shutdown_pools():
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)